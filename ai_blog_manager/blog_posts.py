@@ -1,20 +1,29 @@
 from __future__ import annotations
 
+import os
 import re
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
-from typing import Any
-
-import yaml
+from typing import TYPE_CHECKING, Any, Callable
 
 from .paths import posts_root, repo_root
 
+if TYPE_CHECKING:
+    from .dedup import DedupIndex
+
 
 class BlogPostError(RuntimeError):
     pass
 
 
+class NearDuplicateError(BlogPostError):
+    def __init__(self, message: str, matches: list[dict[str, Any]]) -> None:
+        super().__init__(message)
+        self.matches = matches
+
+
 @dataclass(frozen=True)
 class PostFrontmatter:
     title: str
@@ -102,6 +111,19 @@ def normalize_markdown_body(body: str) -> str:
     return s
 
 
+def duplicate_mode() -> str:
+    mode = os.getenv("BLOG_DUPLICATE_MODE", "reject").strip().lower()
+    return mode if mode in {"reject", "flag", "off"} else "reject"
+
+
+def duplicate_threshold() -> float:
+    try:
+        value = float(os.getenv("BLOG_DUPLICATE_THRESHOLD", "0.8"))
+    except ValueError:
+        return 0.8
+    return value if 0.0 < value <= 1.0 else 0.8
+
+
 def slugify(title: str) -> str:
     s = title.strip().lower()
     s = _slug_re.sub("-", s)
@@ -122,6 +144,8 @@ def _split_frontmatter(md: str) -> tuple[str, str]:
 
 
 def parse_frontmatter(md: str) -> PostFrontmatter:
+    import yaml
+
     fm_text, _ = _split_frontmatter(md)
     try:
         data = yaml.safe_load(fm_text) or {}
@@ -155,6 +179,8 @@ def parse_frontmatter(md: str) -> PostFrontmatter:
 
 
 def build_markdown(*, title: str, tags: list[str], summary: str, slug: str, body: str, post_date: str) -> str:
+    import yaml
+
     fm: dict[str, Any] = {
         "title": title,
         "date": post_date,
@@ -191,7 +217,16 @@ def list_existing_slugs() -> dict[str, Path]:
     return out
 
 
-def write_post(*, title: str, tags: list[str], summary: str, content: str, overwrite: bool = False) -> dict[str, Any]:
+def _write_post(
+    *,
+    title: str,
+    tags: list[str],
+    summary: str,
+    content: str,
+    overwrite: bool,
+    existing: dict[str, Path],
+    dedup: "DedupIndex | None" = None,
+) -> dict[str, Any]:
     if not isinstance(title, str) or not title.strip():
         raise BlogPostError("title is required")
     if not isinstance(summary, str) or not summary.strip():
@@ -211,7 +246,6 @@ def write_post(*, title: str, tags: list[str], summary: str, content: str, overw
     root = posts_root()
     root.mkdir(parents=True, exist_ok=True)
 
-    existing = list_existing_slugs()
     if post_slug in existing and not overwrite:
         raise BlogPostError(f"Slug already exists: {post_slug}. Set overwrite=true to replace.")
 
@@ -229,14 +263,146 @@ def write_post(*, title: str, tags: list[str], summary: str, content: str, overw
     )
 
     _ = parse_frontmatter(md)
+    rel_path = str(target.relative_to(repo_root())).replace("\\", "/")
+
+    matches: list[dict[str, Any]] = []
+    if dedup is not None:
+        matches = dedup.near_duplicates(content or "", threshold=duplicate_threshold(), exclude=post_slug)
+        # Rows for posts deleted from disk are stale, not duplicates.
+        for stale in [m for m in matches if m["slug"] not in existing]:
+            dedup.remove(stale["slug"])
+        matches = [m for m in matches if m["slug"] in existing]
+        if matches and duplicate_mode() == "reject":
+            best = matches[0]
+            raise NearDuplicateError(
+                f"Near-duplicate of existing post '{best['slug']}' (similarity {best['similarity']}). "
+                "Set BLOG_DUPLICATE_MODE=flag to write it anyway.",
+                matches,
+            )
 
     target.write_text(md, encoding="utf-8", newline="\n")
-    rel = target.relative_to(repo_root())
+    existing[post_slug] = target
+    if dedup is not None:
+        dedup.add(post_slug, rel_path, content or "")
 
-    return {
+    result: dict[str, Any] = {
         "status": "ok",
-        "path": str(rel).replace("\\", "/"),
+        "path": rel_path,
         "slug": post_slug,
         "title": title.strip(),
         "date": post_date,
     }
+    if matches:
+        result["near_duplicates"] = matches
+    return result
+
+
+def _dedup_index() -> "DedupIndex | None":
+    if duplicate_mode() == "off":
+        return None
+    # Imported here: dedup builds on this module's parsing helpers.
+    from .dedup import get_dedup_index
+
+    return get_dedup_index()
+
+
+# Called with the repo-relative paths of posts written (or rewritten) in this
+# process, after the write. A failing hook never fails the write.
+_post_write_hooks: dict[Any, Callable[[list[str]], None]] = {}
+
+
+def add_post_write_hook(key: Any, hook: Callable[[list[str]], None]) -> None:
+    """Register ``hook`` under ``key`` (registering the same key again replaces it)."""
+
+    _post_write_hooks[key] = hook
+
+
+def notify_posts_written(paths: list[str]) -> None:
+    if not paths:
+        return
+    for hook in list(_post_write_hooks.values()):
+        try:
+            hook(paths)
+        except Exception:
+            pass
+
+
+def index_related_on_write(*, model: str, host: str) -> None:
+    """Keep the related-posts index current for posts written by this process.
+
+    Embedding runs on a background thread, so writes don't wait on Ollama.
+    """
+
+    def _hook(paths: list[str]) -> None:
+        # Imported here: related pulls in numpy.
+        from .related import update_in_background
+
+        update_in_background(paths, model=model, host=host)
+
+    add_post_write_hook(("related", model, host), _hook)
+
+
+def write_post(*, title: str, tags: list[str], summary: str, content: str, overwrite: bool = False) -> dict[str, Any]:
+    dedup = _dedup_index()
+    if dedup is None:
+        result = _write_post(
+            title=title,
+            tags=tags,
+            summary=summary,
+            content=content,
+            overwrite=overwrite,
+            existing=list_existing_slugs(),
+        )
+        notify_posts_written([result["path"]])
+        return result
+
+    # Hold the index lock across check + write so two concurrent near-identical
+    # posts (from this or another process) cannot both pass the check.
+    with dedup.locked():
+        result = _write_post(
+            title=title,
+            tags=tags,
+            summary=summary,
+            content=content,
+            overwrite=overwrite,
+            existing=list_existing_slugs(),
+            dedup=dedup,
+        )
+        dedup.flush()
+    notify_posts_written([result["path"]])
+    return result
+
+
+def write_posts(posts: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Write several posts with a single scan of existing slugs.
+
+    Each item takes the same keys as ``write_post``. Failures are reported
+    per item as ``{"status": "error", "error": ...}`` so one bad payload does
+    not abort the rest; slugs written earlier in the batch count as existing.
+    """
+
+    existing = list_existing_slugs()
+    dedup = _dedup_index()
+    results: list[dict[str, Any]] = []
+    with dedup.locked() if dedup is not None else nullcontext():
+        for post in posts:
+            try:
+                results.append(
+                    _write_post(
+                        title=post.get("title"),
+                        tags=post.get("tags"),
+                        summary=post.get("summary"),
+                        content=post.get("content"),
+                        overwrite=bool(post.get("overwrite", False)),
+                        existing=existing,
+                        dedup=dedup,
+                    )
+                )
+            except NearDuplicateError as e:
+                results.append({"status": "error", "error": str(e), "near_duplicates": e.matches})
+            except BlogPostError as e:
+                results.append({"status": "error", "error": str(e)})
+        if dedup is not None:
+            dedup.flush()
+    notify_posts_written([r["path"] for r in results if r.get("status") == "ok"])
+    return results
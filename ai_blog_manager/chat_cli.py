@@ -3,12 +3,15 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import queue
 import re
 import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, TextIO
 
-from dotenv import load_dotenv
-
-from .blog_posts import BlogPostError, write_post
+from .blog_posts import BlogPostError, index_related_on_write, write_post
 from .git_ops import GitError, stage_commit_push
 from .ollama_client import OllamaError, chat, extract_json_object
 from .paths import repo_root
@@ -99,7 +102,177 @@ def _build_repair_prompt(*, user_instruction: str, bad_output: str) -> str:
     )
 
 
+def _generate_payload(user: str, *, model: str, host: str, no_llm: bool) -> dict:
+    if no_llm:
+        payload = json.loads(user)
+    else:
+        prompt = _build_prompt(user)
+        raw = chat(prompt=prompt, model=model, host=host)
+        try:
+            payload = extract_json_object(raw)
+        except OllamaError:
+            print("Model output wasn't valid JSON; retrying once...", file=sys.stderr)
+            repair = _build_repair_prompt(user_instruction=user, bad_output=raw)
+            raw2 = chat(prompt=repair, model=model, host=host)
+            payload = extract_json_object(raw2)
+
+    if not isinstance(payload, dict):
+        raise BlogPostError("Payload must be a JSON object")
+    return payload
+
+
+def _write_payload(payload: dict) -> dict:
+    title = payload.get("title")
+    summary = payload.get("summary")
+    content = payload.get("content")
+    overwrite = bool(payload.get("overwrite", False))
+
+    title_s = str(title or "").strip()
+    content_s = str(content or "")
+    summary_s = str(summary or "").strip()
+    if not summary_s:
+        summary_s = _derive_summary(title=title_s, content=content_s)
+
+    tags_list = _coerce_tags(payload.get("tags"))
+
+    return write_post(
+        title=title_s,
+        tags=tags_list,
+        summary=summary_s,
+        content=content_s,
+        overwrite=overwrite,
+    )
+
+
+def _git_publish(result: dict) -> dict:
+    return stage_commit_push(
+        repo_root=str(repo_root()),
+        paths=[result["path"]],
+        message=f"AI Post: {result['title']}",
+    )
+
+
+def _error_record(e: BaseException) -> dict:
+    if isinstance(e, (BlogPostError, OllamaError, GitError, json.JSONDecodeError)):
+        return {"status": "error", "error": str(e)}
+    return {"status": "error", "error": f"Unexpected error: {e}"}
+
+
+def _iter_instructions(stream: TextIO) -> Iterator[str]:
+    for line in stream:
+        user = line.strip()
+        if not user or user.startswith("#"):
+            continue
+        if user.lower() in {"exit", "quit"}:
+            break
+        yield user
+
+
+def run_pipeline(
+    instructions: Iterable[str],
+    *,
+    model: str,
+    host: str,
+    no_llm: bool = False,
+    git: bool = False,
+    workers: int = 2,
+    queue_size: int = 4,
+    out: TextIO | None = None,
+) -> int:
+    """Process instructions through generate -> write -> git stages.
+
+    Generation runs ``workers`` items ahead of the writer (bounded by
+    ``queue_size``), and git commit/push runs on its own thread, so the model
+    stays busy while earlier posts are written and pushed. Writes, commits and
+    the JSON lines on ``out`` all happen in input order. Returns the number of
+    failed items; if the publisher stage itself fails (e.g. ``out`` is closed),
+    the remaining work is cancelled and that exception is re-raised.
+    """
+
+    workers = max(1, workers)
+    window = workers + max(0, queue_size)
+    publish_q: queue.Queue[tuple[int, str, dict] | None] = queue.Queue(maxsize=max(1, queue_size))
+    stream = out if out is not None else sys.stdout
+    failures = 0
+
+    def emit(index: int, user: str, record: dict) -> None:
+        # Only the publisher thread emits, so output order and the failure
+        # count need no extra locking.
+        nonlocal failures
+        if record.get("status") == "error" or (record.get("git") or {}).get("status") == "error":
+            failures += 1
+        stream.write(json.dumps({"index": index, "input": user, **record}, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    # Set if the publisher dies (e.g. BrokenPipeError from `| head`); the
+    # producer side checks it instead of blocking forever on a full queue.
+    publisher_error: list[BaseException] = []
+    publisher_failed = threading.Event()
+
+    def publisher() -> None:
+        try:
+            while True:
+                item = publish_q.get()
+                if item is None:
+                    return
+                index, user, record = item
+                if git and record.get("status") == "ok":
+                    try:
+                        record["git"] = _git_publish(record)
+                    except Exception as e:
+                        record["git"] = _error_record(e)
+                emit(index, user, record)
+        except BaseException as e:
+            publisher_error.append(e)
+            publisher_failed.set()
+
+    publisher_thread = threading.Thread(target=publisher, name="chat-cli-git", daemon=True)
+    publisher_thread.start()
+
+    def publish(item: tuple[int, str, dict] | None) -> bool:
+        while not publisher_failed.is_set():
+            try:
+                publish_q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write_next(pending: deque[tuple[int, str, Future[dict]]]) -> bool:
+        index, user, fut = pending.popleft()
+        try:
+            record = _write_payload(fut.result())
+        except Exception as e:
+            record = _error_record(e)
+        return publish((index, user, record))
+
+    pending: deque[tuple[int, str, Future[dict]]] = deque()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-cli-gen")
+    try:
+        for index, user in enumerate(instructions):
+            pending.append((index, user, pool.submit(_generate_payload, user, model=model, host=host, no_llm=no_llm)))
+            while len(pending) >= window or (pending and pending[0][2].done()):
+                if not write_next(pending):
+                    break
+            if publisher_failed.is_set():
+                break
+        while pending and not publisher_failed.is_set():
+            write_next(pending)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    if publish(None):
+        publisher_thread.join()
+    if publisher_error:
+        raise publisher_error[0]
+    return failures
+
+
 def main(argv: list[str] | None = None) -> int:
+    # Imported here so `import ai_blog_manager.chat_cli` (e.g. from
+    # http_server) doesn't pay for it.
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     parser = argparse.ArgumentParser(description="Local AI blog manager (writes /content/posts)")
@@ -107,8 +280,39 @@ def main(argv: list[str] | None = None) -> int:
     parser.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
     parser.add_argument("--git", action="store_true", help="git add/commit/push post changes")
     parser.add_argument("--no-llm", action="store_true", help="paste payload JSON manually")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="non-interactive: read one instruction per line from FILE ('-' for stdin), print JSON lines",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="concurrent generations in --batch mode")
+    parser.add_argument("--queue-size", type=int, default=4, help="items buffered between --batch stages")
     args = parser.parse_args(argv)
 
+    if not args.no_llm:
+        index_related_on_write(model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"), host=args.host)
+
+    if args.batch:
+        common = dict(
+            model=args.model,
+            host=args.host,
+            no_llm=args.no_llm,
+            git=args.git,
+            workers=args.workers,
+            queue_size=args.queue_size,
+        )
+        try:
+            if args.batch == "-":
+                failures = run_pipeline(_iter_instructions(sys.stdin), **common)
+            else:
+                with open(args.batch, encoding="utf-8") as f:
+                    failures = run_pipeline(_iter_instructions(f), **common)
+        except BrokenPipeError:
+            # Downstream closed (e.g. `| head`); silence the flush at exit.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        return 1 if failures else 0
+
     print("AI blog manager (local). Type 'exit' to quit.", file=sys.stderr)
 
     while True:
@@ -123,51 +327,12 @@ def main(argv: list[str] | None = None) -> int:
             break
 
         try:
-            if args.no_llm:
-                payload = json.loads(user)
-            else:
-                prompt = _build_prompt(user)
-                raw = chat(prompt=prompt, model=args.model, host=args.host)
-                try:
-                    payload = extract_json_object(raw)
-                except OllamaError:
-                    print("Model output wasn't valid JSON; retrying once...", file=sys.stderr)
-                    repair = _build_repair_prompt(user_instruction=user, bad_output=raw)
-                    raw2 = chat(prompt=repair, model=args.model, host=args.host)
-                    payload = extract_json_object(raw2)
-
-            if not isinstance(payload, dict):
-                raise BlogPostError("Payload must be a JSON object")
-
-            title = payload.get("title")
-            summary = payload.get("summary")
-            content = payload.get("content")
-            overwrite = bool(payload.get("overwrite", False))
-
-            title_s = str(title or "").strip()
-            content_s = str(content or "")
-            summary_s = str(summary or "").strip()
-            if not summary_s:
-                summary_s = _derive_summary(title=title_s, content=content_s)
-
-            tags_list = _coerce_tags(payload.get("tags"))
-
-            result = write_post(
-                title=title_s,
-                tags=tags_list,
-                summary=summary_s,
-                content=content_s,
-                overwrite=overwrite,
-            )
+            payload = _generate_payload(user, model=args.model, host=args.host, no_llm=args.no_llm)
+            result = _write_payload(payload)
             print(json.dumps(result, indent=2), file=sys.stderr)
 
             if args.git and result.get("status") == "ok":
-                rel_path = result["path"]
-                git_result = stage_commit_push(
-                    repo_root=str(repo_root()),
-                    paths=[rel_path],
-                    message=f"AI Post: {result['title']}",
-                )
+                git_result = _git_publish(result)
                 print(json.dumps({"git": git_result}, indent=2), file=sys.stderr)
 
         except (BlogPostError, OllamaError, GitError, json.JSONDecodeError) as e:
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from .blog_posts import (
+    BlogPostError,
+    _split_frontmatter,
+    duplicate_threshold,
+    normalize_markdown_body,
+    parse_frontmatter,
+)
+from .paths import posts_root, repo_root
+from .row_store import RowStore
+
+
+_INDEX_VERSION = 1
+_NUM_PERM = 128
+_SHINGLE = 3
+_SEED = 1337
+_PRIME = 4294967311  # > 2**32, so a*x + b stays below 2**64 for 32-bit x
+
+_word_re = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)?")
+
+
+def dedup_root() -> Path:
+    # Lives next to the posts it describes; rebuilt with --reindex.
+    return posts_root().parent / ".dedup"
+
+
+def _perm_params() -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _perm_params()
+_BAND_WEIGHTS = np.random.default_rng(_SEED + 1).integers(1, 1 << 63, size=_NUM_PERM, dtype=np.uint64) | 1
+
+
+def normalized_tokens(body: str) -> list[str]:
+    s = normalize_markdown_body(body).lower()
+    s = re.sub(r"```.*?```", " ", s, flags=re.DOTALL)
+    s = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", s)
+    return _word_re.findall(s)
+
+
+def signature(body: str) -> np.ndarray | None:
+    """MinHash signature (uint32[_NUM_PERM]) of a post body, or None if too short."""
+
+    tokens = normalized_tokens(body)
+    if len(tokens) < _SHINGLE:
+        return None
+    shingles = {" ".join(tokens[i : i + _SHINGLE]) for i in range(len(tokens) - _SHINGLE + 1)}
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    hashed = (_PERM_A[:, None] * x[None, :] + _PERM_B[:, None]) % np.uint64(_PRIME)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def _integrate(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    # Trapezoid rule along the last axis.
+    return ((y[..., 1:] + y[..., :-1]) * np.diff(x)).sum(axis=-1) / 2
+
+
+@lru_cache(maxsize=None)
+def lsh_params(
+    threshold: float,
+    num_perm: int = _NUM_PERM,
+    *,
+    fp_weight: float = 0.05,
+    fn_weight: float = 0.95,
+) -> tuple[int, int]:
+    """(bands, rows) for LSH at ``threshold`` Jaccard with ``num_perm`` hashes.
+
+    Picks the split minimising the weighted false-positive area below the
+    threshold plus the false-negative area above it, as datasketch does.
+    Candidates are re-scored exactly, so a false positive only costs a
+    comparison while a false negative is a missed duplicate; hence the
+    weighting towards recall (>= ~0.9 chance of a candidate at the
+    threshold). Signatures don't depend on it, only the band buckets.
+    """
+
+    if not 0.0 < threshold <= 1.0:
+        raise ValueError(f"Duplicate threshold must be in (0, 1], got {threshold}")
+    pairs = np.array([(b, r) for b in range(1, num_perm + 1) for r in range(1, num_perm // b + 1)], dtype=np.float64)
+    s = np.linspace(0.0, 1.0, 2001)
+    # P(candidate | Jaccard s) for every (bands, rows), shape (pairs, grid).
+    p = 1.0 - (1.0 - s[None, :] ** pairs[:, 1:2]) ** pairs[:, 0:1]
+    below, above = s <= threshold, s >= threshold
+    fp = _integrate(p[:, below], s[below]) if below.sum() > 1 else 0.0
+    fn = _integrate(1.0 - p[:, above], s[above]) if above.sum() > 1 else 0.0
+    bands, rows = pairs[int(np.argmin(fp_weight * fp + fn_weight * fn))]
+    return int(bands), int(rows)
+
+
+def _band_keys(sigs: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    # (n, num_perm) -> (n, bands): one 64-bit key per LSH band. Hashes past
+    # bands * rows are still scored, just not banded.
+    banded = sigs[:, : bands * rows].reshape(-1, bands, rows).astype(np.uint64)
+    return (banded * _BAND_WEIGHTS[:rows]).sum(axis=2, dtype=np.uint64)
+
+
+class DedupIndex:
+    """MinHash + LSH banding index over normalized post bodies.
+
+    Signatures live in a ``RowStore`` under ``content/.dedup``; band buckets
+    are rebuilt in memory on load, so a lookup only scores posts that share
+    at least one band with the query instead of scanning the corpus. The
+    banding is derived from ``threshold`` (see ``lsh_params``) and recorded
+    in the store header. Rows another process appends are re-bucketed one
+    by one, so keeping up with other writers costs O(their changes).
+    """
+
+    def __init__(self, root: Path | None = None, *, threshold: float | None = None) -> None:
+        self.root = root or dedup_root()
+        self.threshold = duplicate_threshold() if threshold is None else threshold
+        self.bands, self.rows = lsh_params(self.threshold)
+        self.lock = threading.RLock()
+        self._store = RowStore(
+            self.root,
+            "minhash",
+            dtype=np.uint32,
+            header={
+                "version": _INDEX_VERSION,
+                "num_perm": _NUM_PERM,
+                "bands": self.bands,
+                "rows": self.rows,
+                "shingle": _SHINGLE,
+            },
+        )
+        self._buckets: list[dict[int, set[str]]] = [{} for _ in range(self.bands)]
+        # Band keys each slug is filed under, to unfile it without its old row.
+        self._slug_keys: dict[str, list[int]] = {}
+        self._store.on_reload = self._on_reload
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @property
+    def _built_path(self) -> Path:
+        return self.root / "minhash.built"
+
+    @property
+    def built(self) -> bool:
+        """True once every post was indexed for this banding (by ``backfill`` or ``reindex``).
+
+        Kept apart from the store, which also gets rows from writes made
+        while a backfill is still running.
+        """
+
+        try:
+            return json.loads(self._built_path.read_text(encoding="utf-8")) == self._store.header
+        except (OSError, ValueError):
+            return False
+
+    def load(self) -> None:
+        with self.lock:
+            self._store.load()
+            self._rebuild_buckets()
+
+    def _rebuild_buckets(self) -> None:
+        self._buckets = [{} for _ in range(self.bands)]
+        self._slug_keys = {}
+        if len(self._store):
+            keys = self._band_keys(np.asarray(self._store.matrix)).tolist()
+            for entry, row_keys in zip(self._store.entries, keys):
+                self._file(entry["key"], row_keys)
+
+    def _on_reload(self, records: list[dict[str, Any]] | None) -> None:
+        if records is None:
+            self._rebuild_buckets()
+            return
+        touched = {rec["put"]["key"] if "put" in rec else rec.get("remove") for rec in records}
+        touched.discard(None)
+        for slug in touched:
+            self._unbucket(slug)
+            sig = self._store.get(slug)
+            if sig is not None:
+                self._file(slug, self._band_keys(np.asarray(sig))[0].tolist())
+
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        return _band_keys(np.atleast_2d(sigs), self.bands, self.rows)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the index against other threads and processes, freshly reloaded.
+
+        Callers wrap check -> write post -> add -> flush in this so two
+        writers cannot both pass the check or clobber each other's rows.
+        """
+
+        # Taking the store lock reloads it (and the buckets) if stale.
+        with self.lock, self._store.locked():
+            yield
+
+    def refresh(self) -> None:
+        """Reload if another process rewrote the index since the last load."""
+
+        with self.lock:
+            self._store.refresh()
+
+    def _file(self, slug: str, keys: list[int]) -> None:
+        self._slug_keys[slug] = keys
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, set()).add(slug)
+
+    def _unbucket(self, slug: str) -> None:
+        for band, key in enumerate(self._slug_keys.pop(slug, ())):
+            members = self._buckets[band].get(key)
+            if members is not None:
+                members.discard(slug)
+                if not members:
+                    del self._buckets[band][key]
+
+    def add(self, slug: str, path: str, body: str) -> None:
+        self._add_signature(slug, path, signature(body))
+
+    def _add_signature(self, slug: str, path: str, sig: np.ndarray | None) -> None:
+        with self.lock:
+            # The store may reload (and re-bucket) on taking its lock, so
+            # bucket only after the row is written.
+            if sig is None:
+                self._store.remove(slug)
+            else:
+                self._store.put(slug, sig, path=path)
+            self._unbucket(slug)
+            if sig is not None:
+                self._file(slug, self._band_keys(sig)[0].tolist())
+
+    def remove(self, slug: str) -> None:
+        with self.lock:
+            self._store.remove(slug)
+            self._unbucket(slug)
+
+    def flush(self) -> None:
+        with self.lock:
+            self._store.flush()
+
+    def candidates(self, sig: np.ndarray) -> set[str]:
+        out: set[str] = set()
+        for band, key in enumerate(self._band_keys(sig)[0].tolist()):
+            out |= self._buckets[band].get(key, set())
+        return out
+
+    def near_duplicates(self, body: str, *, threshold: float, exclude: str | None = None) -> list[dict[str, Any]]:
+        """Posts whose estimated Jaccard similarity to ``body`` is >= threshold."""
+
+        sig = signature(body)
+        if sig is None:
+            return []
+        with self.lock:
+            slugs = [s for s in self.candidates(sig) if s != exclude]
+            if not slugs:
+                return []
+            rows = np.fromiter((self._store.rows[s] for s in slugs), dtype=np.int64, count=len(slugs))
+            scores = (np.asarray(self._store.matrix[rows]) == sig).mean(axis=1)
+            entries = self._store.entries
+            hits = [
+                {"slug": slugs[i], "path": entries[rows[i]]["path"], "similarity": round(float(scores[i]), 3)}
+                for i in np.argsort(-scores)
+                if scores[i] >= threshold
+            ]
+        return hits
+
+    def _posts(self) -> Iterator[tuple[str, str, np.ndarray | None] | None]:
+        # (slug, path, signature) per post in content/posts; None if unparseable.
+        root = posts_root()
+        for p in sorted(root.glob("*.md")) if root.exists() else []:
+            try:
+                md = p.read_text(encoding="utf-8")
+                fm = parse_frontmatter(md)
+                _, body = _split_frontmatter(md)
+            except BlogPostError:
+                yield None
+                continue
+            rel = str(p.resolve().relative_to(repo_root())).replace("\\", "/")
+            yield fm.slug, rel, signature(body)
+
+    def _add_missing(self, items: Iterator[tuple[str, str, np.ndarray | None] | None]) -> dict[str, int]:
+        stats = {"indexed": 0, "skipped": 0}
+        for item in items:
+            if item is None or item[0] in self._store.rows:
+                stats["skipped"] += 1
+                continue
+            self._add_signature(*item)
+            stats["indexed"] += 1
+        self._store.flush()
+        self._built_path.write_text(json.dumps(self._store.header), encoding="utf-8")
+        return stats
+
+    def reindex(self) -> dict[str, int]:
+        """Rebuild from content/posts."""
+
+        with self.lock, self._store.locked():
+            self._built_path.unlink(missing_ok=True)
+            self._store.clear()
+            self._buckets = [{} for _ in range(self.bands)]
+            self._slug_keys = {}
+            return self._add_missing(self._posts())
+
+    def backfill(self) -> dict[str, int]:
+        """Index posts missing from the index without holding up writers.
+
+        Signatures are computed with no lock held; rows written in the
+        meantime are newer and kept.
+        """
+
+        items = list(self._posts())
+        with self.locked():
+            return self._add_missing(iter(items))
+
+
+_index: DedupIndex | None = None
+_index_lock = threading.Lock()
+# Builds an index that doesn't exist yet (or was built for another threshold)
+# off the write path; pending builds still finish before the interpreter exits.
+_backfill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedup-backfill")
+
+
+def get_dedup_index() -> DedupIndex:
+    """The process-wide index, brought up to date with other writers.
+
+    An index that was never built is filled in the background; until then
+    only posts already in it (e.g. written since) are checked. Use
+    ``--reindex`` to build it up front.
+    """
+
+    global _index
+    with _index_lock:
+        if _index is None or _index.threshold != duplicate_threshold():
+            _index = DedupIndex()
+            _index.load()
+            if not _index.built:
+                _backfill_executor.submit(_index.backfill)
+        else:
+            _index.refresh()
+        return _index
+
+
+def _synthetic_corpus(n: int, *, words: int, dup_rate: float, seed: int) -> tuple[list[str], list[tuple[int, int]]]:
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(20000)])
+    docs: list[str] = []
+    pairs: list[tuple[int, int]] = []
+    for i in range(n):
+        if docs and rng.random() < dup_rate:
+            src = int(rng.integers(0, len(docs)))
+            toks = docs[src].split()
+            # Light edit: swap ~3% of words, like a reworded near-duplicate.
+            for j in rng.choice(len(toks), size=max(1, len(toks) // 33), replace=False):
+                toks[j] = str(vocab[rng.integers(0, len(vocab))])
+            docs.append(" ".join(toks))
+            pairs.append((i, src))
+        else:
+            docs.append(" ".join(vocab[rng.integers(0, len(vocab), size=words)]))
+    return docs, pairs
+
+
+def bench(n: int, *, words: int = 400, dup_rate: float = 0.01, queries: int = 200, threshold: float = 0.8) -> dict[str, Any]:
+    docs, pairs = _synthetic_corpus(n, words=words, dup_rate=dup_rate, seed=_SEED)
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = DedupIndex(Path(tmp), threshold=threshold)
+
+        t0 = time.perf_counter()
+        for i, doc in enumerate(docs):
+            idx.add(f"p{i}", f"p{i}.md", doc)
+        idx.flush()
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        idx.load()
+        load_s = time.perf_counter() - t0
+
+        sample = pairs[:queries] or [(0, 0)]
+        found = 0
+        cand_total = 0
+        t0 = time.perf_counter()
+        for dup, src in sample:
+            hits = idx.near_duplicates(docs[dup], threshold=threshold, exclude=f"p{dup}")
+            found += any(h["slug"] == f"p{src}" for h in hits)
+        query_s = (time.perf_counter() - t0) / len(sample)
+        for dup, _ in sample:
+            sig = signature(docs[dup])
+            assert sig is not None
+            cand_total += len(idx.candidates(sig))
+
+        # Linear scan over all signatures for comparison.
+        sig = signature(docs[sample[0][0]])
+        assert sig is not None
+        t0 = time.perf_counter()
+        _ = (np.asarray(idx._store.matrix) == sig).mean(axis=1)
+        scan_s = time.perf_counter() - t0
+
+    return {
+        "posts": n,
+        "threshold": threshold,
+        "bands": idx.bands,
+        "rows": idx.rows,
+        "planted_duplicates": len(pairs),
+        "build_s": round(build_s, 3),
+        "load_s": round(load_s, 3),
+        "query_ms": round(query_s * 1000, 3),
+        "linear_scan_ms": round(scan_s * 1000, 3),
+        "avg_candidates": round(cand_total / len(sample), 1),
+        "recall": round(found / len(sample), 3) if pairs else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Near-duplicate (MinHash/LSH) index for posts")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the index from content/posts")
+    parser.add_argument("--check", metavar="FILE", help="list indexed posts that near-duplicate FILE's body")
+    parser.add_argument("--threshold", type=float, default=duplicate_threshold())
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark on N synthetic posts")
+    args = parser.parse_args(argv)
+
+    if not 0.0 < args.threshold <= 1.0:
+        parser.error(f"--threshold must be in (0, 1], got {args.threshold}")
+    if args.bench:
+        print(json.dumps(bench(args.bench, threshold=args.threshold), indent=2))
+        return 0
+
+    idx = DedupIndex(threshold=args.threshold)
+    if args.reindex:
+        print(json.dumps(idx.reindex()), file=sys.stderr)
+    else:
+        idx.load()
+        if not idx.built:
+            print("Index not built yet; run with --reindex.", file=sys.stderr)
+
+    if args.check:
+        md = Path(args.check).read_text(encoding="utf-8")
+        try:
+            slug = parse_frontmatter(md).slug
+            _, body = _split_frontmatter(md)
+        except BlogPostError:
+            slug, body = None, md
+        print(json.dumps(idx.near_duplicates(body, threshold=args.threshold, exclude=slug), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,16 +2,20 @@ from __future__ import annotations
 
 import os
 import subprocess
+import threading
 from typing import Iterable
 
-import requests
-
 
 class GitError(RuntimeError):
     pass
 
 
-def _run(repo_root: str, args: list[str]) -> str:
+# The HTTP server handles requests on threads; concurrent git add/commit in
+# one checkout would race on .git/index.lock.
+_git_lock = threading.RLock()
+
+
+def _run(repo_root: str, args: list[str], *, input: str | None = None) -> str:
     try:
         proc = subprocess.run(
             args,
@@ -19,6 +23,7 @@ def _run(repo_root: str, args: list[str]) -> str:
             check=True,
             capture_output=True,
             text=True,
+            input=input,
         )
     except subprocess.CalledProcessError as e:
         raise GitError((e.stderr or e.stdout or str(e)).strip()) from e
@@ -26,19 +31,39 @@ def _run(repo_root: str, args: list[str]) -> str:
     return (proc.stdout or "").strip()
 
 
-def stage_commit_push(*, repo_root: str, paths: Iterable[str], message: str) -> dict:
+def stage_commit(*, repo_root: str, paths: Iterable[str], message: str) -> dict:
     paths = list(paths)
     if not paths:
         raise GitError("No paths provided to stage")
 
-    _run(repo_root, ["git", "add", "--"] + paths)
+    with _git_lock:
+        # Paths go over stdin so large change sets don't hit the argv limit.
+        _run(
+            repo_root,
+            ["git", "add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+            input="\0".join(paths) + "\0",
+        )
+
+        status = _run(repo_root, ["git", "status", "--porcelain"])
+        if not status:
+            return {"status": "noop", "detail": "No changes to commit"}
+
+        _run(repo_root, ["git", "commit", "-m", message])
+    return {"status": "committed", "count": len(paths)}
+
 
-    status = _run(repo_root, ["git", "status", "--porcelain"])
-    if not status:
-        return {"status": "noop", "detail": "No changes to commit"}
+def stage_commit_push(*, repo_root: str, paths: Iterable[str], message: str) -> dict:
+    with _git_lock:
+        committed = stage_commit(repo_root=repo_root, paths=paths, message=message)
+        if committed["status"] == "noop":
+            return committed
+        _push(repo_root)
+
+    deployment = confirm_pages_deploy()
+    return {"status": "pushed", "deployment": deployment}
 
-    _run(repo_root, ["git", "commit", "-m", message])
 
+def _push(repo_root: str) -> None:
     token = os.getenv("GITHUB_TOKEN", "").strip()
     repo = os.getenv("GITHUB_REPO", "").strip()
     if token and repo and "/" in repo:
@@ -53,9 +78,6 @@ def stage_commit_push(*, repo_root: str, paths: Iterable[str], message: str) ->
     else:
         _run(repo_root, ["git", "push"])
 
-    deployment = confirm_pages_deploy()
-    return {"status": "pushed", "deployment": deployment}
-
 
 def confirm_pages_deploy() -> dict:
     token = os.getenv("GITHUB_TOKEN", "").strip()
@@ -66,6 +88,8 @@ def confirm_pages_deploy() -> dict:
             "detail": "Set GITHUB_TOKEN and GITHUB_REPO to check Pages build status",
         }
 
+    import requests
+
     owner, name = repo.split("/", 1)
     url = f"https://api.github.com/repos/{owner}/{name}/pages/builds/latest"
     headers = {
@@ -1,35 +1,136 @@
 from __future__ import annotations
 
 import argparse
+import gzip
 import json
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+from urllib.parse import parse_qs, urlsplit
 
-from dotenv import load_dotenv
-
-from .blog_posts import BlogPostError, write_post
+from .blog_posts import BlogPostError, NearDuplicateError, index_related_on_write, write_post
 from .chat_cli import _build_prompt, _build_repair_prompt, _coerce_tags, _derive_summary
 from .git_ops import GitError, stage_commit_push
+from .long_form import generate_long_payload, parse_hosts
 from .ollama_client import OllamaError, chat, extract_json_object
 from .paths import repo_root
 
+if TYPE_CHECKING:
+    from .related import RelatedIndex
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+
+_READ_CHUNK = 64 * 1024
+
+
+class _BodyTooLarge(ValueError):
+    pass
+
+
+def _encoding_qvalues(header: str) -> dict[str, float]:
+    out: dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            k, _, v = param.strip().partition("=")
+            if k.strip().lower() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if name:
+            out[name] = q
+    return out
+
+
+def _accepts(qvalues: dict[str, float], encoding: str) -> bool:
+    # An explicit entry wins over "*", so "gzip;q=0, *" still refuses gzip.
+    q = qvalues.get(encoding, qvalues.get("*", 0.0))
+    return q > 0
+
+
+def _compress(handler: BaseHTTPRequestHandler, body: bytes) -> tuple[bytes, str | None]:
+    min_size = getattr(handler.server, "compress_min_bytes", 1024)
+    if min_size <= 0 or len(body) < min_size:
+        return body, None
+    qvalues = _encoding_qvalues(handler.headers.get("Accept-Encoding", ""))
+    if brotli is not None and _accepts(qvalues, "br"):
+        return brotli.compress(body, quality=5), "br"
+    if _accepts(qvalues, "gzip"):
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
 
 def _json_response(handler: BaseHTTPRequestHandler, *, status: int, payload: dict[str, Any]) -> None:
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    body, encoding = _compress(handler, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
     handler.send_response(status)
     handler.send_header("Content-Type", "application/json; charset=utf-8")
     handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Vary", "Accept-Encoding")
+    if encoding:
+        handler.send_header("Content-Encoding", encoding)
+    if handler.close_connection:
+        handler.send_header("Connection", "close")
     handler.send_header("Access-Control-Allow-Origin", "*")
     handler.send_header("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
-    handler.send_header("Access-Control-Allow-Headers", "Content-Type")
+    handler.send_header("Access-Control-Allow-Headers", "Content-Type, Idempotency-Key")
     handler.end_headers()
     handler.wfile.write(body)
 
 
-def _read_json(handler: BaseHTTPRequestHandler) -> dict[str, Any]:
-    length = int(handler.headers.get("Content-Length", "0") or "0")
-    raw = handler.rfile.read(length) if length else b""
+def _read_exact(handler: BaseHTTPRequestHandler, n: int, out: bytearray) -> None:
+    while n > 0:
+        chunk = handler.rfile.read(min(n, _READ_CHUNK))
+        if not chunk:
+            raise ValueError("Incomplete request body")
+        out += chunk
+        n -= len(chunk)
+
+
+def _read_body(handler: BaseHTTPRequestHandler, *, max_bytes: int) -> bytes:
+    raw = bytearray()
+    if "chunked" in handler.headers.get("Transfer-Encoding", "").lower():
+        while True:
+            line = handler.rfile.readline(1024)
+            try:
+                size = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError as e:
+                raise ValueError("Invalid chunked request body") from e
+            if size == 0:
+                # Skip optional trailers up to the terminating blank line.
+                while handler.rfile.readline(1024) not in {b"\r\n", b"\n", b""}:
+                    pass
+                break
+            if len(raw) + size > max_bytes:
+                raise _BodyTooLarge(f"Request body exceeds {max_bytes} bytes")
+            _read_exact(handler, size, raw)
+            handler.rfile.readline(1024)
+        return bytes(raw)
+
+    try:
+        length = int(handler.headers.get("Content-Length", "0") or "0")
+    except ValueError as e:
+        raise ValueError("Invalid Content-Length") from e
+    if length < 0:
+        raise ValueError("Invalid Content-Length")
+    if length > max_bytes:
+        raise _BodyTooLarge(f"Request body exceeds {max_bytes} bytes")
+    _read_exact(handler, length, raw)
+    return bytes(raw)
+
+
+def _read_json(handler: BaseHTTPRequestHandler, *, max_bytes: int = 1024 * 1024) -> dict[str, Any]:
+    raw = _read_body(handler, max_bytes=max_bytes)
     if not raw:
         return {}
     try:
@@ -50,6 +151,8 @@ def _create_post_from_instruction(
     git: bool = False,
     length: str | None = None,
     force_tags: list[str] | None = None,
+    ollama_hosts: list[str] | None = None,
+    long_parallelism: int = 0,
 ) -> dict[str, Any]:
     length_s = (length or "").strip().lower()
     length_hint = ""
@@ -66,14 +169,24 @@ def _create_post_from_instruction(
     if cleaned_force_tags:
         tags_hint = "\n\nUse these tags (exactly): " + ", ".join(cleaned_force_tags) + "."
 
-    prompt = _build_prompt(instruction + length_hint + tags_hint)
-    raw = chat(prompt=prompt, model=model, host=ollama_host)
-    try:
-        payload = extract_json_object(raw)
-    except OllamaError:
-        repair = _build_repair_prompt(user_instruction=instruction, bad_output=raw)
-        raw2 = chat(prompt=repair, model=model, host=ollama_host)
-        payload = extract_json_object(raw2)
+    if length_s == "long" and long_parallelism > 0:
+        # Long posts are generated as an outline plus concurrently written
+        # sections; wall-clock time then tracks the longest section.
+        payload = generate_long_payload(
+            instruction=instruction + tags_hint,
+            model=model,
+            hosts=ollama_hosts or [ollama_host],
+            parallelism=long_parallelism,
+        )
+    else:
+        prompt = _build_prompt(instruction + length_hint + tags_hint)
+        raw = chat(prompt=prompt, model=model, host=ollama_host)
+        try:
+            payload = extract_json_object(raw)
+        except OllamaError:
+            repair = _build_repair_prompt(user_instruction=instruction, bad_output=raw)
+            raw2 = chat(prompt=repair, model=model, host=ollama_host)
+            payload = extract_json_object(raw2)
 
     title = str(payload.get("title") or "").strip()
     summary = str(payload.get("summary") or "").strip()
@@ -104,9 +217,131 @@ def _create_post_from_instruction(
     return result
 
 
+class _Call:
+    def __init__(self, key: Hashable) -> None:
+        self.key = key
+        self.done = threading.Event()
+        self.result: dict[str, Any] | None = None
+        self.error: BaseException | None = None
+
+
+class _IdempotencyConflict(RuntimeError):
+    pass
+
+
+class _SingleFlight:
+    """Coalesce concurrent identical create requests onto one generation.
+
+    Callers with the same key attach to the in-flight call and receive its
+    result (or its exception). Successful results can also be remembered
+    under a client ``Idempotency-Key`` for ``ttl`` seconds (at most
+    ``max_keys``, least recently used first out) so retries after completion
+    replay the stored result instead of generating again. Reusing a key for
+    a different request raises ``_IdempotencyConflict``.
+    """
+
+    def __init__(self, *, ttl: float = 600.0, max_keys: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, _Call] = {}
+        self._completed: OrderedDict[str, tuple[float, Hashable, dict[str, Any]]] = OrderedDict()
+
+    def _remember(self, idempotency_key: str | None, key: Hashable, result: dict[str, Any]) -> None:
+        # Caller holds self._lock.
+        if idempotency_key and self.ttl > 0 and self.max_keys > 0:
+            self._completed[idempotency_key] = (time.monotonic() + self.ttl, key, result)
+            self._completed.move_to_end(idempotency_key)
+            while len(self._completed) > self.max_keys:
+                self._completed.popitem(last=False)
+
+    def _purge(self, now: float) -> None:
+        expired = [k for k, (exp, _, _) in self._completed.items() if exp <= now]
+        for k in expired:
+            del self._completed[k]
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], dict[str, Any]],
+        *,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            stored = self._completed.get(idempotency_key) if idempotency_key else None
+            if stored is not None:
+                if stored[1] != key:
+                    raise _IdempotencyConflict("Idempotency-Key was already used for a different request")
+                self._completed.move_to_end(idempotency_key)  # type: ignore[arg-type]
+                return stored[2]
+
+            # An idempotency key wins over the body: a retry with the same key
+            # attaches to the original call even if the payload was re-encoded.
+            flight_key: Hashable = ("idempotency", idempotency_key) if idempotency_key else key
+            call = self._inflight.get(flight_key)
+            if call is not None and call.key != key:
+                raise _IdempotencyConflict("Idempotency-Key is in use by a different in-flight request")
+            if call is None and idempotency_key:
+                call = self._inflight.get(key)
+                if call is not None:
+                    self._inflight[flight_key] = call
+            leader = call is None
+            if leader:
+                call = _Call(key)
+                self._inflight[flight_key] = call
+                if idempotency_key:
+                    self._inflight[key] = call
+
+        assert call is not None
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            assert call.result is not None
+            with self._lock:
+                self._remember(idempotency_key, key, call.result)
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                for k in [k for k, c in self._inflight.items() if c is call]:
+                    del self._inflight[k]
+                if call.result is not None:
+                    self._remember(idempotency_key, key, call.result)
+            call.done.set()
+        return call.result
+
+
+def _request_key(
+    *,
+    instruction: str,
+    length: str | None,
+    tags: list[str],
+    model: str,
+    overwrite: bool,
+    git: bool,
+) -> tuple[Any, ...]:
+    norm_instruction = re.sub(r"\s+", " ", instruction).strip().lower()
+    norm_length = (length or "").strip().lower()
+    norm_tags = tuple(t.strip().lower() for t in tags)
+    return (norm_instruction, norm_length, norm_tags, model, overwrite, git)
+
+
 class _Handler(BaseHTTPRequestHandler):
     server: "_AIServer"  # type: ignore[assignment]
 
+    # Persistent connections; every response carries Content-Length.
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections release their thread after this many seconds.
+    timeout = 30
+
     def log_message(self, format: str, *args: Any) -> None:
         # Keep logs terse; this runs alongside Next dev server.
         return
@@ -115,7 +350,8 @@ class _Handler(BaseHTTPRequestHandler):
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, Idempotency-Key")
+        # No Content-Length: a 204 has no body by definition (RFC 9110 8.6).
         self.end_headers()
 
     def do_GET(self) -> None:  # noqa: N802
@@ -127,19 +363,63 @@ class _Handler(BaseHTTPRequestHandler):
                     "status": "ok",
                     "model": self.server.model,
                     "ollama_host": self.server.ollama_host,
+                    "ollama_hosts": self.server.ollama_hosts,
+                    "long_parallelism": self.server.long_parallelism,
                 },
             )
             return
 
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/api/related":
+            self._handle_related(parse_qs(url.query))
+            return
+
         _json_response(self, status=404, payload={"status": "error", "error": "Not found"})
 
+    def _handle_related(self, query: dict[str, list[str]]) -> None:
+        from .related import RelatedIndexError
+
+        slug = (query.get("slug") or [""])[0].strip()
+        if not slug:
+            _json_response(self, status=400, payload={"status": "error", "error": "Missing 'slug'"})
+            return
+        try:
+            k = int((query.get("k") or ["5"])[0])
+        except ValueError:
+            _json_response(self, status=400, payload={"status": "error", "error": "'k' must be an integer"})
+            return
+
+        try:
+            index = self.server.related_index()
+            # Posts written elsewhere (chat_cli, the other server) are picked
+            # up one at a time; full backfills are left to --reindex.
+            index.ensure_post(slug)
+            related = index.related(slug, k=max(1, min(k, 50)))
+        except RelatedIndexError as e:
+            _json_response(self, status=404, payload={"status": "error", "error": str(e)})
+            return
+        except (BlogPostError, OllamaError) as e:
+            _json_response(self, status=500, payload={"status": "error", "error": str(e)})
+            return
+        except Exception as e:
+            _json_response(self, status=500, payload={"status": "error", "error": f"Unexpected error: {e}"})
+            return
+
+        _json_response(self, status=200, payload={"status": "ok", "slug": slug, "related": related})
+
     def do_POST(self) -> None:  # noqa: N802
         if self.path.rstrip("/") != "/api/create_post":
+            # The request body was not read, so the connection can't be reused.
+            self.close_connection = True
             _json_response(self, status=404, payload={"status": "error", "error": "Not found"})
             return
 
         try:
-            body = _read_json(self)
+            try:
+                body = _read_json(self, max_bytes=self.server.max_body_bytes)
+            except ValueError:
+                self.close_connection = True
+                raise
             instruction = str(body.get("instruction") or "").strip()
             if not instruction:
                 _json_response(
@@ -159,18 +439,43 @@ class _Handler(BaseHTTPRequestHandler):
             tags_raw = body.get("tags")
             tags_list = _coerce_tags(tags_raw)
 
-            result = _create_post_from_instruction(
+            idempotency_key = (self.headers.get("Idempotency-Key") or "").strip() or None
+            key = _request_key(
                 instruction=instruction,
+                length=length,
+                tags=tags_list,
                 model=self.server.model,
-                ollama_host=self.server.ollama_host,
                 overwrite=overwrite,
                 git=git,
-                length=length,
-                force_tags=tags_list,
+            )
+            result = self.server.single_flight.do(
+                key,
+                lambda: _create_post_from_instruction(
+                    instruction=instruction,
+                    model=self.server.model,
+                    ollama_host=self.server.ollama_host,
+                    overwrite=overwrite,
+                    git=git,
+                    length=length,
+                    force_tags=tags_list,
+                    ollama_hosts=self.server.ollama_hosts,
+                    long_parallelism=self.server.long_parallelism,
+                ),
+                idempotency_key=idempotency_key,
             )
             _json_response(self, status=200, payload=result)
+        except _BodyTooLarge as e:
+            _json_response(self, status=413, payload={"status": "error", "error": str(e)})
+        except _IdempotencyConflict as e:
+            _json_response(self, status=422, payload={"status": "error", "error": str(e)})
         except (ValueError, json.JSONDecodeError) as e:
             _json_response(self, status=400, payload={"status": "error", "error": str(e)})
+        except NearDuplicateError as e:
+            _json_response(
+                self,
+                status=409,
+                payload={"status": "error", "error": str(e), "near_duplicates": e.matches},
+            )
         except (BlogPostError, OllamaError, GitError) as e:
             _json_response(self, status=500, payload={"status": "error", "error": str(e)})
         except Exception as e:
@@ -185,13 +490,35 @@ class _AIServer(ThreadingHTTPServer):
         *,
         model: str,
         ollama_host: str,
+        ollama_hosts: list[str] | None = None,
+        long_parallelism: int = 0,
+        idempotency_ttl: float = 600.0,
+        embed_model: str = "nomic-embed-text",
+        max_body_bytes: int = 1024 * 1024,
+        compress_min_bytes: int = 1024,
     ) -> None:
         super().__init__(server_address, RequestHandlerClass)
         self.model = model
         self.ollama_host = ollama_host
+        self.ollama_hosts = ollama_hosts or [ollama_host]
+        self.long_parallelism = long_parallelism
+        self.single_flight = _SingleFlight(ttl=idempotency_ttl)
+        self.embed_model = embed_model
+        # write_post hands new posts to the related-posts index in the background.
+        index_related_on_write(model=embed_model, host=ollama_host)
+        self.max_body_bytes = max_body_bytes
+        self.compress_min_bytes = compress_min_bytes
+
+    def related_index(self) -> RelatedIndex:
+        # numpy and the index load on first use, not at server start.
+        from .related import get_index
+
+        return get_index(model=self.embed_model, host=self.ollama_host)
 
 
 def main(argv: list[str] | None = None) -> int:
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     parser = argparse.ArgumentParser(description="Local HTTP API for ai_blog_manager")
@@ -199,6 +526,36 @@ def main(argv: list[str] | None = None) -> int:
     parser.add_argument("--port", type=int, default=int(os.getenv("AI_MANAGER_PORT", "7337")))
     parser.add_argument("--model", default=os.getenv("OLLAMA_MODEL", "llama3.1"))
     parser.add_argument("--ollama-host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    parser.add_argument(
+        "--ollama-hosts",
+        default=os.getenv("OLLAMA_HOSTS", ""),
+        help="comma-separated Ollama hosts used for parallel long-post sections (default: --ollama-host)",
+    )
+    parser.add_argument(
+        "--long-parallelism",
+        type=int,
+        default=int(os.getenv("AI_MANAGER_LONG_PARALLELISM", "4")),
+        help="concurrent section generations for length=long (0 = single-shot)",
+    )
+    parser.add_argument(
+        "--idempotency-ttl",
+        type=float,
+        default=float(os.getenv("AI_MANAGER_IDEMPOTENCY_TTL", "600")),
+        help="seconds to keep results for Idempotency-Key replays (0 = disabled)",
+    )
+    parser.add_argument("--embed-model", default=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"))
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=int(os.getenv("AI_MANAGER_MAX_BODY_BYTES", str(1024 * 1024))),
+        help="reject request bodies larger than this (413)",
+    )
+    parser.add_argument(
+        "--compress-min-bytes",
+        type=int,
+        default=int(os.getenv("AI_MANAGER_COMPRESS_MIN_BYTES", "1024")),
+        help="gzip/brotli-compress responses at least this large when the client accepts it (0 = never)",
+    )
     args = parser.parse_args(argv)
 
     httpd = _AIServer(
@@ -206,10 +563,16 @@ def main(argv: list[str] | None = None) -> int:
         _Handler,
         model=args.model,
         ollama_host=args.ollama_host,
+        ollama_hosts=parse_hosts(args.ollama_hosts, default=args.ollama_host),
+        long_parallelism=max(0, args.long_parallelism),
+        idempotency_ttl=max(0.0, args.idempotency_ttl),
+        embed_model=args.embed_model,
+        max_body_bytes=max(0, args.max_body_bytes),
+        compress_min_bytes=args.compress_min_bytes,
     )
 
     print(f"AI manager HTTP server: http://{args.listen}:{args.port}")
-    print("Endpoints: GET /api/health, POST /api/create_post")
+    print("Endpoints: GET /api/health, GET /api/related?slug=, POST /api/create_post")
     httpd.serve_forever()
     return 0
 
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from .http_server import _AIServer, _Handler
+from .stub_ollama import add_stub_arguments, config_from_args, start_stub
+
+
+@dataclass
+class _Sample:
+    latency_s: float
+    status: int
+    error: str = ""
+
+
+def make_sandbox() -> Path:
+    """Create a throwaway checkout whose `origin` is a local bare repo.
+
+    Pointing BLOGTALK_ROOT here lets the full create path (write, commit,
+    push) run offline without touching the real repository.
+    """
+
+    root = Path(tempfile.mkdtemp(prefix="blogtalk-load-"))
+    remote, work = root / "remote.git", root / "work"
+
+    def git(*args: str, cwd: Path = work) -> None:
+        subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+    remote.mkdir()
+    git("init", "--bare", "-q", cwd=remote)
+    work.mkdir()
+    git("init", "-q")
+    git("config", "user.name", "load-test")
+    git("config", "user.email", "load-test@localhost")
+    git("commit", "-q", "--allow-empty", "-m", "sandbox")
+    git("remote", "add", "origin", str(remote))
+    git("push", "-q", "-u", "origin", "HEAD")
+    (work / "content" / "posts").mkdir(parents=True)
+    return work
+
+
+def spawn_stack(args: argparse.Namespace) -> tuple[str, dict[str, Any]]:
+    """Start a stub Ollama and an in-process AI manager server on a sandbox checkout."""
+
+    sandbox = make_sandbox()
+    os.environ["BLOGTALK_ROOT"] = str(sandbox)
+    # Plain `git push` to the sandbox remote; no Pages API calls.
+    os.environ.pop("GITHUB_TOKEN", None)
+    os.environ.pop("GITHUB_REPO", None)
+
+    stub = start_stub(config_from_args(args))
+    httpd = _AIServer(
+        ("127.0.0.1", 0),
+        _Handler,
+        model="stub",
+        ollama_host=stub.url,
+        long_parallelism=args.long_parallelism,
+        embed_model="stub-embed",
+    )
+    threading.Thread(target=httpd.serve_forever, name="ai-manager", daemon=True).start()
+    host, port = httpd.server_address[:2]
+    return f"http://{host}:{port}", {"sandbox": sandbox, "stub": stub, "httpd": httpd}
+
+
+def stop_stack(extra: dict[str, Any], *, keep_sandbox: bool = False) -> None:
+    extra["httpd"].shutdown()
+    extra["httpd"].server_close()
+    extra["stub"].shutdown()
+    extra["stub"].server_close()
+    if not keep_sandbox:
+        # make_sandbox() returns <tmpdir>/work; the bare remote sits beside it.
+        shutil.rmtree(extra["sandbox"].parent, ignore_errors=True)
+
+
+class _Client:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, url: str, timeout: float) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def post(self, path: str, payload: dict[str, Any]) -> tuple[int, str]:
+        body = json.dumps(payload).encode("utf-8")
+        # The idempotency key makes the one reconnect-and-retry below safe.
+        headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "identity",
+            "Idempotency-Key": uuid.uuid4().hex,
+        }
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                res = conn.getresponse()
+                data = res.read()
+                if res.getheader("Connection", "").lower() == "close":
+                    conn.close()
+                    self._local.conn = None
+            except (ConnectionError, http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.conn = None
+                if attempt == 0 and not isinstance(e, TimeoutError):
+                    continue  # stale keep-alive connection; retry once on a fresh one
+                return 0, f"connection error: {type(e).__name__}"
+            if res.status == 200:
+                return 200, ""
+            try:
+                err = str(json.loads(data).get("error") or "")
+            except ValueError:
+                err = data[:80].decode("utf-8", "replace")
+            return res.status, err
+        return 0, "connection error"
+
+
+def _payload(i: int, args: argparse.Namespace) -> dict[str, Any]:
+    instruction = args.instruction if args.same_instruction else f"{args.instruction} #{i} {uuid.uuid4().hex[:8]}"
+    body: dict[str, Any] = {"instruction": instruction, "git": args.git, "overwrite": args.same_instruction}
+    if args.length:
+        body["length"] = args.length
+    return body
+
+
+def run_closed_loop(client: _Client, args: argparse.Namespace) -> tuple[list[_Sample], float]:
+    samples: list[_Sample] = []
+    lock = threading.Lock()
+    counter = iter(range(args.requests or 1 << 62))
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def worker() -> None:
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None or (deadline is not None and time.perf_counter() >= deadline):
+                return
+            t0 = time.perf_counter()
+            status, err = client.post("/api/create_post", _payload(i, args))
+            with lock:
+                samples.append(_Sample(time.perf_counter() - t0, status, err))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, args.concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def run_open_loop(client: _Client, args: argparse.Namespace) -> tuple[list[_Sample], float]:
+    # Poisson arrivals; latency is measured from the scheduled arrival time so
+    # a backed-up server is not hidden by the generator slowing down.
+    samples: list[_Sample] = []
+    lock = threading.Lock()
+    rng = random.Random(args.seed)
+    total = args.requests or int(args.rate * (args.duration or 10))
+
+    def fire(i: int, scheduled: float) -> None:
+        status, err = client.post("/api/create_post", _payload(i, args))
+        with lock:
+            samples.append(_Sample(time.perf_counter() - scheduled, status, err))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_inflight, thread_name_prefix="load") as pool:
+        t = start
+        for i in range(total):
+            t += rng.expovariate(args.rate)
+            delay = t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, i, t)
+    return samples, time.perf_counter() - start
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def summarize(samples: list[_Sample], elapsed: float) -> dict[str, Any]:
+    ok = sorted(s.latency_s * 1000 for s in samples if s.status == 200)
+    errors: dict[str, int] = {}
+    for s in samples:
+        if s.status != 200:
+            key = f"{s.status or 'conn'}: {s.error[:60]}"
+            errors[key] = errors.get(key, 0) + 1
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "failed": len(samples) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "ok_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(ok, 50), 1),
+            "p95": round(_percentile(ok, 95), 1),
+            "p99": round(_percentile(ok, 99), 1),
+            "max": round(ok[-1], 1) if ok else 0.0,
+            "mean": round(sum(ok) / len(ok), 1) if ok else 0.0,
+        },
+        "errors": dict(sorted(errors.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for POST /api/create_post")
+    parser.add_argument("--url", default=None, help="target AI manager server (omit with --spawn)")
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="run a stub Ollama + AI manager in-process against a throwaway git sandbox",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="closed-loop workers")
+    parser.add_argument("--rate", type=float, default=None, help="open-loop arrivals per second (Poisson)")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open-loop cap on concurrent requests")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--git", action="store_true", help="send git=true (commit + push to the sandbox remote)")
+    parser.add_argument("--length", choices=["short", "medium", "long"], default=None)
+    parser.add_argument("--instruction", default="Write a short post about figure skating")
+    parser.add_argument(
+        "--same-instruction",
+        action="store_true",
+        help="send identical requests (exercises request coalescing)",
+    )
+    parser.add_argument("--long-parallelism", type=int, default=4, help="with --spawn")
+    parser.add_argument(
+        "--keep-sandbox",
+        action="store_true",
+        help="with --spawn, keep the sandbox checkout and report its path",
+    )
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.duration and args.requests == parser.get_default("requests"):
+        args.requests = 0
+
+    extra: dict[str, Any] = {}
+    if args.spawn:
+        url, extra = spawn_stack(args)
+    elif args.url:
+        url = args.url
+    else:
+        parser.error("pass --url or --spawn")
+
+    client = _Client(url, args.timeout)
+    try:
+        if args.rate:
+            samples, elapsed = run_open_loop(client, args)
+            mode: dict[str, Any] = {"mode": "open", "rate": args.rate}
+        else:
+            samples, elapsed = run_closed_loop(client, args)
+            mode = {"mode": "closed", "concurrency": args.concurrency}
+    finally:
+        if args.spawn:
+            stop_stack(extra, keep_sandbox=args.keep_sandbox)
+
+    report = {**mode, "target": url, **summarize(samples, elapsed)}
+    if args.spawn:
+        if args.keep_sandbox:
+            report["sandbox"] = str(extra["sandbox"])
+        report["stub_calls"] = extra["stub"].stats.snapshot()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Sequence
+
+from .ollama_client import OllamaError, chat, extract_json_object
+
+
+_heading_re = re.compile(r"^(\s{0,3})(#{1,6})(\s+)", re.MULTILINE)
+
+
+def parse_hosts(value: str | None, *, default: str) -> list[str]:
+    hosts = [h.strip() for h in re.split(r"[,\s]+", value or "") if h.strip()]
+    return hosts or [default]
+
+
+_OUTLINE_SCHEMA = (
+    "Outline schema:\n"
+    "{\n"
+    "  \"title\": string,\n"
+    "  \"tags\": string[],\n"
+    "  \"summary\": string,\n"
+    "  \"intro\": string (Markdown, 1 short paragraph),\n"
+    "  \"sections\": [\n"
+    "    {\"heading\": string, \"points\": string[]}\n"
+    "  ]\n"
+    "}\n"
+)
+
+_SECTION_SCHEMA = (
+    "Section schema:\n"
+    "{\n"
+    "  \"content\": string (Markdown)\n"
+    "}\n"
+)
+
+
+def _build_outline_prompt(user_instruction: str, *, min_sections: int, max_sections: int) -> str:
+    return (
+        "Plan a long-form blog post for the instruction below. Return ONLY JSON.\n\n"
+        f"{_OUTLINE_SCHEMA}\n"
+        "Rules:\n"
+        f"- Use {min_sections}-{max_sections} sections in reading order.\n"
+        "- Headings are plain text (no '#', no numbering).\n"
+        "- points are 2-4 short notes on what the section must cover.\n"
+        "- summary is REQUIRED (1-2 sentences).\n\n"
+        f"Instruction: {user_instruction}\n"
+    )
+
+
+def _build_section_prompt(
+    *,
+    user_instruction: str,
+    title: str,
+    headings: Sequence[str],
+    index: int,
+    points: Sequence[str],
+    target_words: int,
+) -> str:
+    toc = "\n".join(f"{i + 1}. {h}" for i, h in enumerate(headings))
+    notes = "\n".join(f"- {p}" for p in points) or "- (use your judgement)"
+    return (
+        "Write ONE section of a longer blog post. Return ONLY JSON.\n\n"
+        f"{_SECTION_SCHEMA}\n"
+        "Rules:\n"
+        "- Do NOT repeat the section heading; the tool adds it.\n"
+        "- Use '###' for any sub-headings. Never use '#' or '##'.\n"
+        "- Do NOT write an introduction or conclusion for the whole post.\n"
+        "- Do NOT wrap the text in blockquotes (avoid leading '>' on lines).\n"
+        "- Do NOT double-escape newlines (avoid literal \\\\n in the string).\n"
+        f"- Aim for ~{target_words} words.\n\n"
+        f"Post title: {title}\n"
+        f"Original instruction: {user_instruction}\n\n"
+        f"Post outline:\n{toc}\n\n"
+        f"Write section {index + 1}: {headings[index]}\n"
+        f"Cover:\n{notes}\n"
+    )
+
+
+def _build_repair_prompt(*, schema: str, bad_output: str) -> str:
+    return (
+        "You returned invalid JSON previously. Repair it.\n"
+        "Return ONLY a single valid JSON object. No markdown, no prose.\n\n"
+        f"{schema}\n"
+        "Bad output to repair (verbatim):\n"
+        f"{bad_output}\n"
+    )
+
+
+def _chat_json(*, prompt: str, schema: str, model: str, host: str, raw: str | None = None) -> dict[str, Any]:
+    if raw is None:
+        raw = chat(prompt=prompt, model=model, host=host)
+    try:
+        return extract_json_object(raw)
+    except OllamaError:
+        repair = _build_repair_prompt(schema=schema, bad_output=raw)
+        raw2 = chat(prompt=repair, model=model, host=host)
+        return extract_json_object(raw2)
+
+
+def _coerce_outline(obj: dict[str, Any], *, max_sections: int) -> list[tuple[str, list[str]]]:
+    sections = obj.get("sections")
+    if not isinstance(sections, list):
+        raise OllamaError("Outline JSON missing 'sections' list")
+
+    out: list[tuple[str, list[str]]] = []
+    for s in sections:
+        if isinstance(s, str):
+            heading, points = s, []
+        elif isinstance(s, dict):
+            heading = s.get("heading") or s.get("title") or ""
+            raw_points = s.get("points")
+            points = [str(p).strip() for p in raw_points if str(p).strip()] if isinstance(raw_points, list) else []
+        else:
+            continue
+        heading = re.sub(r"^\s*(?:#+\s*|\d+[.)]\s*)", "", str(heading)).strip()
+        if heading:
+            out.append((heading, points))
+
+    if not out:
+        raise OllamaError("Outline JSON has no usable sections")
+    return out[:max_sections]
+
+
+def _clean_section_body(text: str, heading: str) -> str:
+    s = text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+    # Drop a leading heading if the model repeated it despite the prompt.
+    first, _, rest = s.partition("\n")
+    if _heading_re.match(first) and first.lstrip("# ").strip().lower() == heading.lower():
+        s = rest.strip()
+
+    # Keep the section tree consistent: '##' belongs to the assembler, so any
+    # heading the model emitted at level 1-2 is demoted to '###'.
+    lines: list[str] = []
+    in_fence = False
+    for line in s.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence:
+            m = _heading_re.match(line)
+            if m and len(m.group(2)) < 3:
+                line = f"{m.group(1)}###{m.group(3)}{line[m.end():]}"
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def generate_long_payload(
+    *,
+    instruction: str,
+    model: str,
+    hosts: Sequence[str],
+    parallelism: int = 4,
+    target_words: int = 1900,
+    min_sections: int = 4,
+    max_sections: int = 8,
+) -> dict[str, Any]:
+    """Outline-then-sections generation for long posts.
+
+    Returns the same payload shape as the single-shot prompt
+    (title/tags/summary/content), so callers can hand it to ``write_post``
+    unchanged. Sections are generated concurrently, round-robin across
+    ``hosts``, and assembled in outline order.
+    """
+
+    if not hosts:
+        raise OllamaError("No Ollama hosts configured")
+
+    outline = _chat_json(
+        prompt=_build_outline_prompt(instruction, min_sections=min_sections, max_sections=max_sections),
+        schema=_OUTLINE_SCHEMA,
+        model=model,
+        host=hosts[0],
+    )
+    sections = _coerce_outline(outline, max_sections=max_sections)
+    headings = [h for h, _ in sections]
+    title = str(outline.get("title") or "").strip()
+    per_section = max(150, target_words // len(sections))
+
+    def _section(index: int) -> str:
+        heading, points = sections[index]
+        prompt = _build_section_prompt(
+            user_instruction=instruction,
+            title=title,
+            headings=headings,
+            index=index,
+            points=points,
+            target_words=per_section,
+        )
+        host = hosts[index % len(hosts)]
+        raw = chat(prompt=prompt, model=model, host=host)
+        if "{" not in raw:
+            # Section bodies are plain Markdown; a model that skipped the JSON
+            # wrapper entirely still produced usable text.
+            return _clean_section_body(raw, heading)
+        # Anything else that fails to parse (e.g. a reply cut off inside
+        # `{"content": "...`) is repaired once, then fails the whole post
+        # rather than publishing JSON fragments.
+        obj = _chat_json(prompt=prompt, schema=_SECTION_SCHEMA, model=model, host=host, raw=raw)
+        content = obj.get("content")
+        if not isinstance(content, str):
+            raise OllamaError(f"Section {index + 1} JSON missing 'content' string")
+        return _clean_section_body(content, heading)
+
+    workers = max(1, min(int(parallelism), len(sections)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="long-form") as pool:
+        bodies = list(pool.map(_section, range(len(sections))))
+
+    parts: list[str] = []
+    intro = str(outline.get("intro") or "").strip()
+    if intro:
+        parts.append(intro)
+    for heading, body in zip(headings, bodies):
+        parts.append(f"## {heading}\n\n{body}" if body else f"## {heading}")
+
+    return {
+        "title": title,
+        "tags": outline.get("tags"),
+        "summary": str(outline.get("summary") or "").strip(),
+        "content": "\n\n".join(parts) + "\n",
+    }
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable
 
 from mcp.server.fastmcp import FastMCP
 
@@ -11,10 +16,20 @@ _repo_root = Path(__file__).resolve().parents[1]
 if str(_repo_root) not in sys.path:
     sys.path.insert(0, str(_repo_root))
 
-from ai_blog_manager.blog_posts import BlogPostError, write_post
+from ai_blog_manager.blog_posts import (
+    BlogPostError,
+    NearDuplicateError,
+    index_related_on_write,
+    write_post,
+    write_posts,
+)
 from ai_blog_manager.git_ops import GitError, stage_commit_push
+from ai_blog_manager.ollama_client import OllamaError
 from ai_blog_manager.paths import repo_root
 
+if TYPE_CHECKING:
+    from ai_blog_manager.related import RelatedIndex
+
 
 mcp = FastMCP("blogtalk")
 
@@ -29,8 +44,92 @@ def _unwrap_inspector_args(arg: dict[str, Any]) -> dict[str, Any]:
     return arg
 
 
+def _auto_git_push() -> bool:
+    return os.getenv("AUTO_GIT_PUSH", "").strip() in {"1", "true", "TRUE", "yes", "YES"}
+
+
+def _post_fields(payload: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "title": str(payload.get("title") or ""),
+        "tags": payload.get("tags") if isinstance(payload.get("tags"), list) else [],
+        "summary": str(payload.get("summary") or ""),
+        "content": str(payload.get("content") or ""),
+        "overwrite": bool(payload.get("overwrite", False)),
+    }
+
+
+# Writes run off the event loop but one at a time, so concurrent tool calls
+# cannot both claim the same slug.
+_write_lock = threading.Lock()
+
+
+def _locked_write(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    with _write_lock:
+        return fn(*args, **kwargs)
+
+
+def _related_index() -> RelatedIndex:
+    # numpy and the index load on the first tool call that needs them, so MCP
+    # hosts that spawn a server per session don't wait on them at startup.
+    from ai_blog_manager.related import get_index
+
+    return get_index(
+        model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
+        host=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+    )
+
+
+# write_post hands new posts to the related-posts index on a background
+# thread, like git, so tool results don't wait for embeddings.
+index_related_on_write(
+    model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
+    host=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+)
+
+
+# Git work runs on a single background thread so commits stay serialized and
+# tool calls return as soon as the post is on disk.
+_git_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-git")
+_git_jobs: dict[str, dict[str, Any]] = {}
+_git_jobs_lock = threading.Lock()
+_MAX_FINISHED_JOBS = 100
+
+
+def _run_git_job(job_id: str, paths: list[str], message: str) -> None:
+    with _git_jobs_lock:
+        _git_jobs[job_id]["status"] = "running"
+    try:
+        git_result = stage_commit_push(repo_root=str(repo_root()), paths=paths, message=message)
+        update: dict[str, Any] = {"status": "done", "result": git_result}
+    except GitError as e:
+        update = {"status": "error", "error": str(e)}
+    except Exception as e:
+        update = {"status": "error", "error": f"Unexpected error: {e}"}
+    update["finished_at"] = time.time()
+
+    with _git_jobs_lock:
+        _git_jobs[job_id].update(update)
+        finished = [k for k, j in _git_jobs.items() if j["status"] in {"done", "error"}]
+        for k in finished[:-_MAX_FINISHED_JOBS]:
+            del _git_jobs[k]
+
+
+def _submit_git_job(*, paths: list[str], message: str) -> dict[str, Any]:
+    job_id = uuid.uuid4().hex[:12]
+    with _git_jobs_lock:
+        _git_jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "paths": paths,
+            "message": message,
+            "submitted_at": time.time(),
+        }
+    _git_executor.submit(_run_git_job, job_id, paths, message)
+    return {"status": "pending", "job_id": job_id}
+
+
 @mcp.tool()
-def create_blog_post(payload: dict[str, Any]) -> dict[str, Any]:
+async def create_blog_post(payload: dict[str, Any]) -> dict[str, Any]:
     """Create a Markdown blog post in /content/posts.
 
     Input:
@@ -41,6 +140,9 @@ def create_blog_post(payload: dict[str, Any]) -> dict[str, Any]:
         "summary": "...",
         "overwrite": false
       }
+
+    With AUTO_GIT_PUSH set, git commit/push runs in the background and
+    "git" holds a job handle for git_push_status.
     """
 
     payload = _unwrap_inspector_args(payload)
@@ -48,32 +150,101 @@ def create_blog_post(payload: dict[str, Any]) -> dict[str, Any]:
         return {"status": "error", "error": "Payload must be an object"}
 
     try:
-        result = write_post(
-            title=str(payload.get("title") or ""),
-            tags=payload.get("tags") if isinstance(payload.get("tags"), list) else [],
-            summary=str(payload.get("summary") or ""),
-            content=str(payload.get("content") or ""),
-            overwrite=bool(payload.get("overwrite", False)),
-        )
+        result = await asyncio.to_thread(_locked_write, write_post, **_post_fields(payload))
+    except NearDuplicateError as e:
+        return {"status": "error", "error": str(e), "near_duplicates": e.matches}
     except BlogPostError as e:
         return {"status": "error", "error": str(e)}
     except Exception as e:
         return {"status": "error", "error": f"Unexpected error: {e}"}
 
-    if os.getenv("AUTO_GIT_PUSH", "").strip() in {"1", "true", "TRUE", "yes", "YES"}:
-        try:
-            git_result = stage_commit_push(
-                repo_root=str(repo_root()),
-                paths=[result["path"]],
-                message=f"AI Post: {result['title']}",
-            )
-            result["git"] = git_result
-        except GitError as e:
-            result["git"] = {"status": "error", "error": str(e)}
+    if _auto_git_push():
+        result["git"] = _submit_git_job(paths=[result["path"]], message=f"AI Post: {result['title']}")
 
     return result
 
 
+@mcp.tool()
+async def create_blog_posts(payloads: list[dict[str, Any]]) -> dict[str, Any]:
+    """Create several Markdown blog posts in one call.
+
+    Input: a list of create_blog_post payloads. Posts are written with a
+    single scan of existing slugs; per-post failures are reported in
+    "results" without aborting the batch. With AUTO_GIT_PUSH set, all written
+    posts go into one background commit/push.
+    """
+
+    if not isinstance(payloads, list):
+        return {"status": "error", "error": "payloads must be a list of objects"}
+
+    posts: list[dict[str, Any] | None] = []
+    for p in payloads:
+        p = _unwrap_inspector_args(p)
+        posts.append(_post_fields(p) if isinstance(p, dict) else None)
+
+    try:
+        written = await asyncio.to_thread(_locked_write, write_posts, [p for p in posts if p is not None])
+    except Exception as e:
+        return {"status": "error", "error": f"Unexpected error: {e}"}
+
+    written_iter = iter(written)
+    results = [
+        next(written_iter) if p is not None else {"status": "error", "error": "Payload must be an object"}
+        for p in posts
+    ]
+    ok = [r for r in results if r.get("status") == "ok"]
+    out: dict[str, Any] = {
+        "status": "ok" if len(ok) == len(results) else ("partial" if ok else "error"),
+        "results": results,
+    }
+
+    if ok and _auto_git_push():
+        message = f"AI Post: {ok[0]['title']}" if len(ok) == 1 else f"AI Posts: {len(ok)} posts"
+        out["git"] = _submit_git_job(paths=[r["path"] for r in ok], message=message)
+
+    return out
+
+
+@mcp.tool()
+async def related_posts(slug: str, k: int = 5) -> dict[str, Any]:
+    """List the posts most similar to `slug` by embedding cosine similarity."""
+
+    from ai_blog_manager.related import RelatedIndexError
+
+    def _query() -> list[dict[str, Any]]:
+        index = _related_index()
+        index.ensure_post(slug.strip())
+        return index.related(slug.strip(), k=max(1, min(k, 50)))
+
+    try:
+        related = await asyncio.to_thread(_query)
+    except (RelatedIndexError, BlogPostError, OllamaError) as e:
+        return {"status": "error", "error": str(e)}
+    except Exception as e:
+        return {"status": "error", "error": f"Unexpected error: {e}"}
+    return {"status": "ok", "slug": slug.strip(), "related": related}
+
+
+@mcp.tool()
+def git_push_status(job_id: str = "") -> dict[str, Any]:
+    """Report background git commit/push jobs.
+
+    With job_id, returns that job. Otherwise lists pending (queued/running)
+    jobs and the most recently finished ones.
+    """
+
+    with _git_jobs_lock:
+        if job_id:
+            job = _git_jobs.get(job_id)
+            return dict(job) if job else {"status": "error", "error": f"Unknown job_id: {job_id}"}
+
+        jobs = [dict(j) for j in _git_jobs.values()]
+
+    pending = [j for j in jobs if j["status"] in {"queued", "running"}]
+    finished = [j for j in jobs if j["status"] not in {"queued", "running"}]
+    return {"status": "ok", "pending": pending, "recent": finished[-10:]}
+
+
 def main() -> None:
     mcp.run(transport="stdio")
 
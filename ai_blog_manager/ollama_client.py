@@ -3,14 +3,14 @@ from __future__ import annotations
 import json
 from typing import Any
 
-import requests
-
 
 class OllamaError(RuntimeError):
     pass
 
 
 def chat(*, prompt: str, model: str, host: str = "http://localhost:11434") -> str:
+    import requests
+
     url = f"{host.rstrip('/')}/api/chat"
     body: dict[str, Any] = {
         "model": model,
@@ -41,6 +41,25 @@ def chat(*, prompt: str, model: str, host: str = "http://localhost:11434") -> st
     return content
 
 
+def embed(*, text: str, model: str, host: str = "http://localhost:11434") -> list[float]:
+    import requests
+
+    url = f"{host.rstrip('/')}/api/embeddings"
+    try:
+        res = requests.post(url, json={"model": model, "prompt": text}, timeout=60)
+    except Exception as e:
+        raise OllamaError(f"Failed to connect to Ollama at {host}: {e}") from e
+
+    if res.status_code != 200:
+        raise OllamaError(f"Ollama HTTP {res.status_code}: {res.text[:200]}")
+
+    data = res.json()
+    vec = data.get("embedding")
+    if not isinstance(vec, list) or not vec:
+        raise OllamaError("Ollama response missing embedding")
+    return [float(x) for x in vec]
+
+
 def extract_json_object(text: str) -> dict[str, Any]:
     s = text.strip()
     if s.startswith("```"):
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 
 def repo_root() -> Path:
-    # ai_blog_manager/paths.py -> repo root
+    # BLOGTALK_ROOT points the tools at another checkout (e.g. a load-test
+    # sandbox); otherwise ai_blog_manager/paths.py -> repo root.
+    override = os.getenv("BLOGTALK_ROOT", "").strip()
+    if override:
+        return Path(override).resolve()
     return Path(__file__).resolve().parents[1]
 
 
 def posts_root() -> Path:
     return repo_root() / "content" / "posts"
+
+
+def cache_root() -> Path:
+    # Local, regenerable indexes (not committed).
+    return repo_root() / ".cache" / "ai_blog_manager"
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from .blog_posts import BlogPostError, _split_frontmatter, parse_frontmatter
+from .ollama_client import embed
+from .paths import cache_root, posts_root, repo_root
+from .row_store import RowStore
+
+
+_INDEX_VERSION = 1
+_MAX_EMBED_CHARS = 8000
+
+
+class RelatedIndexError(RuntimeError):
+    pass
+
+
+def embedding_text(md: str) -> tuple[str, str]:
+    """Return (slug, text to embed) for a post's Markdown source."""
+
+    fm = parse_frontmatter(md)
+    _, body = _split_frontmatter(md)
+    text = f"{fm.title}\n\n{fm.summary}\n\n{body.strip()}"
+    return fm.slug, text[:_MAX_EMBED_CHARS]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RelatedIndex:
+    """Post embeddings cached on disk for related-post lookups.
+
+    Vectors are L2-normalised float32 rows in one contiguous ``RowStore``
+    matrix so a query is a single matrix-vector product. Each row records the
+    content hash its vector was computed from; only posts whose hash changes
+    are re-embedded.
+    """
+
+    def __init__(
+        self,
+        *,
+        model: str,
+        host: str,
+        root: Path | None = None,
+        embed_fn: Callable[[str], list[float]] | None = None,
+    ) -> None:
+        self.model = model
+        self.host = host
+        self.root = root or (cache_root() / "related")
+        self._embed = embed_fn or (lambda text: embed(text=text, model=model, host=host))
+        self._lock = threading.RLock()
+        # Vectors from another model are not comparable; a header mismatch
+        # makes the store start over.
+        self._store = RowStore(
+            self.root,
+            "embeddings",
+            dtype=np.float32,
+            header={"version": _INDEX_VERSION, "model": model},
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._store)
+
+    def refresh(self) -> None:
+        """Reload if another process (e.g. the other server) flushed since the last load."""
+
+        with self._lock:
+            self._store.refresh()
+
+    def _index_files(self, items: list[tuple[str, str, str, str]]) -> int:
+        """Index ``(slug, rel_path, digest, text)`` items; returns how many rows changed.
+
+        Embedding calls run without any lock held. The new rows are written
+        under the store's cross-process lock, after a refresh, so rows
+        flushed by other processes in the meantime are kept.
+        """
+
+        with self._lock:
+            self.refresh()
+            todo = []
+            for slug, rel, digest, text in items:
+                row = self._store.rows.get(slug)
+                entry = self._store.entries[row] if row is not None else None
+                if entry is None or entry.get("hash") != digest:
+                    todo.append((slug, rel, digest, text))
+                elif entry.get("path") != rel:
+                    todo.append((slug, rel, digest, None))
+
+        if not todo:
+            return 0
+        vectors = [self._embed(text) if text is not None else None for _, _, _, text in todo]
+
+        with self._lock, self._store.locked():
+            self.refresh()
+            for (slug, rel, digest, _), vector in zip(todo, vectors):
+                if vector is None:
+                    current = self._store.get(slug)
+                    if current is None:
+                        continue
+                    vector = np.array(current)
+                self._put(slug, rel, digest, vector)
+            self._store.flush()
+        return len(todo)
+
+    def _item(self, path: Path, md: str | None = None) -> tuple[str, str, str, str]:
+        if md is None:
+            md = path.read_text(encoding="utf-8")
+        slug, text = embedding_text(md)
+        rel = str(path.resolve().relative_to(repo_root())).replace("\\", "/")
+        return slug, rel, content_hash(text), text
+
+    def _put(self, slug: str, rel_path: str, digest: str, vector: list[float] | np.ndarray) -> None:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        if norm > 0:
+            v = v / norm
+        try:
+            self._store.put(slug, v, path=rel_path, hash=digest)
+        except ValueError as e:
+            raise RelatedIndexError(f"{e} (run --reindex after clearing {self.root})") from e
+
+    def update_post(self, path: str | Path) -> bool:
+        """Embed one post if its content changed. Returns True if the index changed."""
+
+        p = Path(path)
+        if not p.is_absolute():
+            p = repo_root() / p
+        return self._index_files([self._item(p)]) > 0
+
+    def ensure_post(self, slug: str) -> None:
+        """Index ``slug`` if it is missing or its post changed since it was embedded.
+
+        Covers posts written or rewritten outside the write hook (e.g. by
+        hand or by another checkout); only the one post is read.
+        """
+
+        with self._lock:
+            self.refresh()
+            row = self._store.rows.get(slug)
+            known = self._store.entries[row]["path"] if row is not None else None
+        candidates: list[Path] = []
+        if known and (repo_root() / known).exists():
+            candidates.append(repo_root() / known)
+        else:
+            root = posts_root()
+            # Posts are saved as <date>-<slug>.md; confirm against the frontmatter.
+            candidates.extend(sorted(root.glob(f"*-{glob.escape(slug)}.md")) if root.exists() else [])
+        for p in candidates:
+            try:
+                item = self._item(p)
+            except BlogPostError:
+                continue
+            if item[0] == slug:
+                # Re-embeds only if the content hash differs.
+                self._index_files([item])
+                return
+
+    def sync(self, *, batch_size: int = 64) -> dict[str, int]:
+        """Bring the index in line with content/posts, embedding only changed posts.
+
+        Progress is flushed every ``batch_size`` posts, and queries and
+        single-post updates are not blocked while embeddings are computed.
+        """
+
+        seen: set[str] = set()
+        stats = {"embedded": 0, "unchanged": 0, "removed": 0, "skipped": 0}
+        batch: list[tuple[str, str, str, str]] = []
+
+        def _run_batch() -> None:
+            changed = self._index_files(batch)
+            stats["embedded"] += changed
+            stats["unchanged"] += len(batch) - changed
+            batch.clear()
+
+        root = posts_root()
+        for p in sorted(root.glob("*.md")) if root.exists() else []:
+            try:
+                item = self._item(p)
+            except BlogPostError:
+                stats["skipped"] += 1
+                continue
+            if item[0] in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(item[0])
+            batch.append(item)
+            if len(batch) >= batch_size:
+                _run_batch()
+        _run_batch()
+
+        with self._lock, self._store.locked():
+            self.refresh()
+            # A post another process wrote after the scan above is kept.
+            entries, rows = self._store.entries, self._store.rows
+            gone = [s for s, i in rows.items() if s not in seen and not (repo_root() / entries[i]["path"]).exists()]
+            for slug in gone:
+                self._store.remove(slug)
+                stats["removed"] += 1
+            if stats["removed"]:
+                self._store.flush()
+        return stats
+
+    def _top_k(self, q: np.ndarray, *, k: int, exclude: int | None = None) -> list[dict[str, Any]]:
+        n = len(self._store)
+        if n == 0:
+            return []
+        scores = self._store.matrix @ q
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = max(0, min(k, n - (1 if exclude is not None else 0)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        entries = self._store.entries
+        return [
+            {"slug": entries[i]["key"], "path": entries[i]["path"], "score": round(float(scores[i]), 4)}
+            for i in top
+        ]
+
+    def related(self, slug: str, *, k: int = 5) -> list[dict[str, Any]]:
+        with self._lock:
+            self.refresh()
+            row = self._store.rows.get(slug)
+            if row is None:
+                raise RelatedIndexError(f"Unknown slug: {slug}")
+            q = np.array(self._store.matrix[row], dtype=np.float32)
+            return self._top_k(q, k=k, exclude=row)
+
+    def similar_to_text(self, text: str, *, k: int = 5) -> list[dict[str, Any]]:
+        q = np.asarray(self._embed(text[:_MAX_EMBED_CHARS]), dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+        with self._lock:
+            self.refresh()
+            return self._top_k(q, k=k)
+
+
+_indexes: dict[tuple[str, str], RelatedIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(*, model: str, host: str) -> RelatedIndex:
+    with _indexes_lock:
+        idx = _indexes.get((model, host))
+        if idx is None:
+            idx = RelatedIndex(model=model, host=host)
+            _indexes[(model, host)] = idx
+        return idx
+
+
+# One worker keeps embedding calls off the write path and in order; pending
+# updates still finish before the interpreter exits.
+_update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="related-index")
+
+
+def _update_posts(paths: list[str], *, model: str, host: str) -> None:
+    index = get_index(model=model, host=host)
+    for p in paths:
+        try:
+            index.update_post(p)
+        except Exception:
+            # The post is written; the index catches up on the next query or sync.
+            pass
+
+
+def update_in_background(paths: list[str], *, model: str, host: str) -> None:
+    _update_executor.submit(_update_posts, list(paths), model=model, host=host)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Embedding index for related posts")
+    parser.add_argument("--model", default=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"))
+    parser.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    parser.add_argument("--reindex", action="store_true", help="embed new/changed posts and drop deleted ones")
+    parser.add_argument("--slug", help="print posts related to this slug")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    idx = get_index(model=args.model, host=args.host)
+    if args.reindex or not len(idx):
+        print(json.dumps(idx.sync()), file=sys.stderr)
+    if args.slug:
+        print(json.dumps(idx.related(args.slug, k=args.k), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
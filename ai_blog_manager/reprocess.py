@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from .blog_posts import (
+    BlogPostError,
+    _split_frontmatter,
+    build_markdown,
+    index_related_on_write,
+    notify_posts_written,
+    parse_frontmatter,
+)
+from .git_ops import GitError, stage_commit, stage_commit_push
+from .paths import posts_root, repo_root
+
+
+def render_post(md: str) -> str:
+    """Re-render a post through the current frontmatter/body pipeline."""
+
+    fm = parse_frontmatter(md)
+    _, body = _split_frontmatter(md)
+    return build_markdown(
+        title=fm.title,
+        tags=fm.tags,
+        summary=fm.summary,
+        slug=fm.slug,
+        body=body,
+        post_date=fm.date,
+    )
+
+
+def _process_one(path: str, write: bool, want_diff: bool) -> dict[str, Any]:
+    p = Path(path)
+    try:
+        old_bytes = p.read_bytes()
+        old = old_bytes.decode("utf-8")
+        new_bytes = render_post(old).encode("utf-8")
+    except (BlogPostError, UnicodeDecodeError) as e:
+        return {"path": path, "status": "error", "error": str(e)}
+
+    if new_bytes == old_bytes:
+        return {"path": path, "status": "unchanged"}
+
+    new = new_bytes.decode("utf-8")
+    old_lines = old.replace("\r\n", "\n").split("\n")
+    new_lines = new.split("\n")
+    added = removed = 0
+    diff_lines: list[str] = []
+    for line in difflib.unified_diff(old_lines, new_lines, fromfile=path, tofile=path, lineterm=""):
+        if want_diff:
+            diff_lines.append(line)
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+
+    if write:
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_bytes(new_bytes)
+        os.replace(tmp, p)
+
+    out: dict[str, Any] = {"path": path, "status": "changed", "added": added, "removed": removed}
+    if want_diff:
+        out["diff"] = "\n".join(diff_lines)
+    return out
+
+
+def _process_chunk(paths: list[str], write: bool, want_diff: bool) -> list[dict[str, Any]]:
+    return [_process_one(p, write, want_diff) for p in paths]
+
+
+def _rel(path: str) -> str:
+    return str(Path(path).resolve().relative_to(repo_root())).replace("\\", "/")
+
+
+def _chunks(items: list[str], size: int) -> Iterable[list[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def reprocess(
+    paths: list[Path],
+    *,
+    write: bool,
+    workers: int | None = None,
+    want_diff: bool = False,
+) -> list[dict[str, Any]]:
+    """Re-render ``paths`` in a process pool; only files whose bytes change are written.
+
+    Results come back in input order.
+    """
+
+    items = [str(p) for p in paths]
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(items) < 64:
+        return _process_chunk(items, write, want_diff)
+
+    # Chunks amortise pickling/IPC; several per worker keeps the pool balanced.
+    size = max(16, min(1000, len(items) // (workers * 8) or 1))
+    results: list[dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = list(_chunks(items, size))
+        for chunk_result in pool.map(
+            _process_chunk, chunks, [write] * len(chunks), [want_diff] * len(chunks)
+        ):
+            results.extend(chunk_result)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-run frontmatter/body normalization over content/posts (writes only changed files)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--diff", action="store_true", help="print unified diffs of changed files to stderr")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--git", action="store_true", help="commit changed files as one commit")
+    parser.add_argument("--push", action="store_true", help="with --git, also push (and check Pages)")
+    parser.add_argument("--message", default="Reprocess posts")
+    parser.add_argument("--no-index", action="store_true", help="don't update the related-posts index")
+    args = parser.parse_args(argv)
+
+    root = posts_root()
+    paths = sorted(root.glob("*.md")) if root.exists() else []
+    results = reprocess(paths, write=not args.dry_run, workers=args.workers, want_diff=args.diff)
+
+    changed = [r for r in results if r["status"] == "changed"]
+    errors = [r for r in results if r["status"] == "error"]
+
+    if args.diff:
+        for r in changed:
+            print(r["diff"], file=sys.stderr)
+
+    summary: dict[str, Any] = {
+        "status": "ok" if not errors else "partial",
+        "dry_run": args.dry_run,
+        "scanned": len(results),
+        "changed": len(changed),
+        "unchanged": len(results) - len(changed) - len(errors),
+        "lines_added": sum(r["added"] for r in changed),
+        "lines_removed": sum(r["removed"] for r in changed),
+        "files": [{"path": _rel(r["path"]), "added": r["added"], "removed": r["removed"]} for r in changed],
+        "errors": [{"path": _rel(r["path"]), "error": r["error"]} for r in errors],
+    }
+
+    if changed and not args.dry_run and not args.no_index:
+        # Workers write the files; the related-posts hook runs here, and
+        # only posts whose embedding text changed are re-embedded.
+        index_related_on_write(
+            model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
+            host=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+        )
+        notify_posts_written([_rel(r["path"]) for r in changed])
+
+    if args.git and changed and not args.dry_run:
+        commit = stage_commit_push if args.push else stage_commit
+        try:
+            summary["git"] = commit(
+                repo_root=str(repo_root()),
+                paths=[_rel(r["path"]) for r in changed],
+                message=args.message,
+            )
+        except GitError as e:
+            summary["git"] = {"status": "error", "error": str(e)}
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if errors or (summary.get("git") or {}).get("status") == "error" else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
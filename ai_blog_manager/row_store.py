@@ -0,0 +1,440 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+def _lock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+            time.sleep(0.05)
+
+
+def _unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class RowStore:
+    """Keyed fixed-width rows in one contiguous, memory-mapped ``.npy`` file.
+
+    ``<name>.npy`` holds the matrix (capacity grows by doubling, deletes
+    swap-remove the last row). Row metadata is a ``<name>.json`` snapshot
+    (``header`` plus one entry dict per row) followed by ``<name>.log``, an
+    append-only list of put/remove records, so a flush writes only what
+    changed. The log is folded into a new snapshot once it outgrows the
+    store. A store whose saved header differs from ``header`` (e.g. another
+    model or hash scheme) is treated as empty.
+
+    Several processes may share a store. ``locked()`` takes an exclusive
+    lock on ``<name>.lock`` and reloads the store if another process changed
+    it. The first put/remove/clear takes it and holds it until flush(), and
+    callers that read before writing hold it across the whole read ->
+    put/remove -> flush, so row numbers, log records and matrix growth never
+    interleave. A reload replays only the log records appended since the
+    last one, unless the snapshot was rewritten. ``on_reload`` is called
+    after a reload with those records (or None after a full reload) so
+    owners can update derived state.
+    """
+
+    def __init__(self, root: Path, name: str, *, dtype: Any, header: dict[str, Any]) -> None:
+        self.root = root
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.header = header
+        self.entries: list[dict[str, Any]] = []
+        self.rows: dict[str, int] = {}
+        self._mat: np.ndarray | None = None
+        self._generation = 0
+        self._log_records = 0
+        self._log_offset = 0  # bytes of the log already applied
+        self._pending: list[dict[str, Any]] = []
+        # Set when the on-disk snapshot can't be extended by the log (missing,
+        # other header, or cleared in memory); the next flush rewrites it.
+        self._needs_snapshot = True
+        self._built = False
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_fd: int | None = None
+        self._stamp: tuple[int, ...] | None = None
+        self._loaded = False
+        self.on_reload: Callable[[list[dict[str, Any]] | None], None] | None = None
+        self._dirty = False
+
+    @property
+    def meta_path(self) -> Path:
+        return self.root / f"{self.name}.json"
+
+    @property
+    def log_path(self) -> Path:
+        return self.root / f"{self.name}.log"
+
+    @property
+    def matrix_path(self) -> Path:
+        return self.root / f"{self.name}.npy"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.root / f"{self.name}.lock"
+
+    def _acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._lock_depth == 0:
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    _lock_file(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._lock_fd = fd
+            self._lock_depth = 1
+            self.refresh()
+        else:
+            self._lock_depth += 1
+
+    def _release(self) -> None:
+        self._lock_depth -= 1
+        if self._lock_depth == 0 and self._lock_fd is not None:
+            _unlock_file(self._lock_fd)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._thread_lock.release()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Exclusive, re-entrant lock across threads and processes."""
+
+        self._acquire()
+        try:
+            yield
+        except BaseException:
+            if self._dirty and self._lock_depth == 2:
+                # Leaving the outermost block with unflushed changes: drop
+                # them (the next refresh reloads) and give up the lock.
+                self._dirty, self._pending, self._loaded = False, [], False
+                self._release()
+            raise
+        finally:
+            self._release()
+
+    def _begin_change(self) -> None:
+        # The first unflushed change keeps the lock until flush(), so another
+        # process can't claim the same row in between.
+        if not self._dirty:
+            self._acquire()
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stamp(self) -> tuple[int, ...] | None:
+        """Changes whenever any process flushes or grows the matrix.
+
+        (snapshot mtime, snapshot inode, log mtime, log inode, log size, matrix inode)
+        """
+
+        try:
+            meta = self.meta_path.stat()
+        except FileNotFoundError:
+            return None
+        try:
+            log = self.log_path.stat()
+            log_mtime, log_ino, log_size = log.st_mtime_ns, log.st_ino, log.st_size
+        except FileNotFoundError:
+            log_mtime = log_ino = log_size = 0
+        try:
+            matrix = self.matrix_path.stat().st_ino
+        except FileNotFoundError:
+            matrix = 0
+        return meta.st_mtime_ns, meta.st_ino, log_mtime, log_ino, log_size, matrix
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the live rows, shape ``(len(self), width)``."""
+
+        if self._mat is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return self._mat[: len(self.entries)]
+
+    def refresh(self) -> bool:
+        """Reload if another process flushed since our last load or flush.
+
+        Returns True if the store was reloaded.
+        """
+
+        with self._thread_lock:
+            if self._dirty:
+                return False  # never drop unflushed local changes
+            stamp = self.stamp()
+            if self._loaded and stamp == self._stamp:
+                return False
+            records = self._catch_up(stamp) if self._loaded else None
+            if records is None:
+                self.load()
+            if self.on_reload is not None:
+                self.on_reload(records)
+            return True
+
+    def _catch_up(self, stamp: tuple[int, ...] | None) -> list[dict[str, Any]] | None:
+        # Apply just the records appended to the log since the last load, so
+        # keeping up with another writer costs O(its changes). None means a
+        # full load is needed (snapshot rewritten, log replaced or truncated).
+        old = self._stamp
+        if stamp is None or old is None or not self._built:
+            return None
+        if stamp[:2] != old[:2] or stamp[3] != old[3] or stamp[4] < self._log_offset:
+            return None
+        mat = self._mat
+        if stamp[5] != old[5]:
+            try:
+                mat = np.load(self.matrix_path, mmap_mode="r+")
+            except Exception:
+                return None
+            if mat.ndim != 2 or mat.dtype != self.dtype:
+                return None
+        records = self._replay_log(self._log_offset)
+        if len(self.entries) > (0 if mat is None else mat.shape[0]):
+            return None
+        now = self.stamp()
+        if now is None or now[5] != stamp[5]:
+            return None  # the matrix grew while the log was read
+        self._mat = mat
+        self._stamp = stamp
+        return records
+
+    def load(self) -> None:
+        with self._thread_lock:
+            self._load()
+            self._stamp = self.stamp()
+            self._loaded = True
+
+    def _load(self) -> None:
+        self.entries, self.rows, self._mat = [], {}, None
+        self._pending, self._log_records, self._log_offset = [], 0, 0
+        self._needs_snapshot, self._built = True, False
+        if not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if meta.get("header") != self.header:
+            return
+        mat = None
+        if self.matrix_path.exists():  # a store that never held a row has none
+            try:
+                mat = np.load(self.matrix_path, mmap_mode="r+")
+            except Exception:
+                return
+            if mat.ndim != 2 or mat.dtype != self.dtype:
+                return
+        self.entries = meta.get("entries") or []
+        self.rows = {e["key"]: i for i, e in enumerate(self.entries)}
+        self._generation = int(meta.get("generation") or 0)
+        self._needs_snapshot = False
+        self._replay_log()
+        if len(self.entries) > (0 if mat is None else mat.shape[0]):
+            self.entries, self.rows, self._needs_snapshot = [], {}, True
+            return
+        self._mat = mat
+        self._built = True
+
+    def _replay_log(self, start: int = 0) -> list[dict[str, Any]]:
+        """Apply log records from byte ``start`` on; returns the records applied."""
+
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(start)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # The piece after the last newline is an unfinished write (or empty).
+        lines = data.split(b"\n")[:-1]
+        pos = start
+        if start == 0:
+            if not lines:
+                return []
+            try:
+                generation = json.loads(lines[0]).get("generation")
+            except ValueError:
+                generation = None
+            if generation != self._generation:
+                # Left over from before the last compaction; the next flush
+                # rewrites it rather than appending to it.
+                self._needs_snapshot = True
+                return []
+            pos += len(lines[0]) + 1
+            lines = lines[1:]
+        records: list[dict[str, Any]] = []
+        for line in lines:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # torn write
+            if "put" in rec:
+                self._apply_put(rec["put"])
+            elif "remove" in rec:
+                self._apply_remove(rec["remove"])
+            records.append(rec)
+            pos += len(line) + 1
+        self._log_records += len(records)
+        self._log_offset = pos
+        return records
+
+    def get(self, key: str) -> np.ndarray | None:
+        row = self.rows.get(key)
+        if row is None or self._mat is None:
+            return None
+        return self._mat[row]
+
+    def _reserve(self, width: int) -> np.ndarray:
+        mat = self._mat
+        n = len(self.entries)
+        if mat is not None and mat.shape[1] != width:
+            raise ValueError(f"Row width changed ({mat.shape[1]} -> {width}); rebuild the index")
+        if mat is not None and n < mat.shape[0]:
+            return mat
+
+        capacity = max(64, 2 * (0 if mat is None else mat.shape[0]))
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.matrix_path.with_suffix(".npy.tmp")
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=(capacity, width))
+        if mat is not None and n:
+            grown[:n] = mat[:n]
+        grown.flush()
+        del grown
+        self._mat = None
+        os.replace(tmp, self.matrix_path)
+        self._mat = np.load(self.matrix_path, mmap_mode="r+")
+        return self._mat
+
+    def _apply_put(self, entry: dict[str, Any]) -> int:
+        row = self.rows.get(entry["key"])
+        if row is None:
+            row = len(self.entries)
+            self.entries.append(entry)
+            self.rows[entry["key"]] = row
+        else:
+            self.entries[row] = entry
+        return row
+
+    def _apply_remove(self, key: str) -> tuple[int, int] | None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return None
+        last = len(self.entries) - 1
+        if row != last:
+            self.entries[row] = self.entries[last]
+            self.rows[self.entries[row]["key"]] = row
+        self.entries.pop()
+        return row, last
+
+    def put(self, key: str, values: np.ndarray, **info: Any) -> int:
+        values = np.asarray(values, dtype=self.dtype)
+        with self.locked():
+            self._begin_change()
+            if key in self.rows:
+                mat = self._mat
+                assert mat is not None
+            else:
+                mat = self._reserve(values.shape[0])
+            entry = {"key": key, **info}
+            row = self._apply_put(entry)
+            mat[row] = values
+            self._pending.append({"put": entry})
+            return row
+
+    def remove(self, key: str) -> int | None:
+        """Drop ``key``. Returns the old index of the row moved into its place, if any."""
+
+        with self.locked():
+            if key not in self.rows or self._mat is None:
+                return None
+            self._begin_change()
+            row, last = self._apply_remove(key)  # type: ignore[misc]
+            self._pending.append({"remove": key})
+            if row == last:
+                return None
+            self._mat[row] = self._mat[last]
+            return last
+
+    def clear(self) -> None:
+        """Drop every row; the next flush writes a fresh snapshot."""
+
+        with self.locked():
+            self._begin_change()
+            self.entries, self.rows = [], {}
+            self._pending, self._needs_snapshot = [], True
+
+    def flush(self) -> None:
+        with self.locked():
+            if self._mat is not None:
+                self._mat.flush()
+            # Compacting once the log is as long as the store keeps flushes
+            # amortised O(changed rows) rather than O(corpus).
+            if self._needs_snapshot or self._log_records + len(self._pending) > max(1024, len(self.entries)):
+                self._write_snapshot()
+            elif self._pending:
+                self._append_log()
+            self._stamp = self.stamp()
+            if self._dirty:
+                self._dirty = False
+                self._release()
+
+    def _append_log(self) -> None:
+        lines = [json.dumps(rec, ensure_ascii=False) for rec in self._pending]
+        with open(self.log_path, "ab") as f:
+            if f.tell() == 0:
+                lines.insert(0, json.dumps({"generation": self._generation}))
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+            # Everything before was applied by the refresh on lock acquire.
+            self._log_offset = f.tell()
+        self._log_records += len(self._pending)
+        self._pending = []
+
+    def _write_snapshot(self) -> None:
+        self._generation += 1
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps(
+                {"header": self.header, "generation": self._generation, "entries": self.entries},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.meta_path)
+        # A crash between the two replaces leaves a log whose generation no
+        # longer matches, which load() ignores.
+        tmp = self.log_path.with_suffix(".log.tmp")
+        head = (json.dumps({"generation": self._generation}) + "\n").encode("utf-8")
+        tmp.write_bytes(head)
+        os.replace(tmp, self.log_path)
+        self._pending, self._log_records, self._log_offset = [], 0, len(head)
+        self._needs_snapshot, self._built = False, True
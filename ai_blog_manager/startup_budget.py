@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+from .paths import repo_root
+
+
+# Convention for the whole package: heavy third-party modules (yaml,
+# requests, numpy, dotenv) are imported inside the function that needs them,
+# not at module level, so starting an entry point only pays for what its
+# startup path uses. This module enforces that.
+#
+# Each entry point has two checks:
+# - import: cumulative `import <module>` time and the modules it pulls in.
+# - startup: wall time from process spawn until the entry point is usable
+#   (exits for the CLI, answers GET /api/health, answers MCP `initialize`),
+#   plus everything imported along the way, so an eager import in main()
+#   is caught too.
+# Budgets (milliseconds) leave headroom over a typical dev machine; scale
+# them with --scale or STARTUP_BUDGET_SCALE on slower hosts.
+ENTRY_POINTS: dict[str, dict[str, Any]] = {
+    "ai_blog_manager.chat_cli": {
+        "budget_ms": 150,
+        "forbid": ["yaml", "requests", "numpy", "dotenv", "mcp"],
+        # An empty --no-llm batch: argument parsing, .env and pipeline setup.
+        "startup": {
+            "kind": "exit",
+            "args": ["--batch", "-", "--no-llm"],
+            "budget_ms": 400,
+            "forbid": ["yaml", "requests", "numpy", "mcp"],
+        },
+    },
+    "ai_blog_manager.http_server": {
+        "budget_ms": 250,
+        "forbid": ["yaml", "requests", "numpy", "dotenv", "mcp"],
+        "startup": {
+            "kind": "http",
+            "budget_ms": 600,
+            "forbid": ["yaml", "requests", "numpy", "mcp"],
+        },
+    },
+    "ai_blog_manager.mcp_server": {
+        # Dominated by mcp.server.fastmcp itself, which must load before the
+        # server can answer `initialize`.
+        "budget_ms": 1500,
+        "forbid": ["yaml", "requests", "numpy"],
+        "startup": {
+            "kind": "mcp",
+            "budget_ms": 2500,
+            "forbid": ["yaml", "requests", "numpy"],
+        },
+    },
+}
+
+_line_re = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def _parse_importtime(stderr: str, module: str | None = None) -> tuple[int | None, set[str]]:
+    cumulative_us: int | None = None
+    loaded: set[str] = set()
+    for line in stderr.splitlines():
+        m = _line_re.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        loaded.add(name)
+        if name == module:
+            cumulative_us = int(m.group(2))
+    return cumulative_us, loaded
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """Import ``module`` in a fresh interpreter with ``-X importtime``.
+
+    Returns (cumulative import time of ``module`` in ms, names of all modules
+    imported along the way).
+    """
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(repo_root()),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative_us, loaded = _parse_importtime(proc.stderr, module)
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime entry for {module}")
+    return cumulative_us / 1000.0, loaded
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_http_health(proc: subprocess.Popen[bytes], port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode} before answering")
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.005)
+        finally:
+            conn.close()
+    raise RuntimeError("timed out waiting for /api/health")
+
+
+def _mcp_initialize(proc: subprocess.Popen[bytes]) -> None:
+    assert proc.stdin is not None and proc.stdout is not None
+    request = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "startup-budget", "version": "0"},
+        },
+    }
+    proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+    proc.stdin.flush()
+    line = proc.stdout.readline()
+    if not line or json.loads(line).get("id") != 1:
+        raise RuntimeError(f"no initialize response (got {line[:200]!r})")
+
+
+def measure_startup(module: str, scenario: dict[str, Any], *, timeout: float = 60.0) -> tuple[float, set[str]]:
+    """Run ``python -m module`` until it is usable, per ``scenario["kind"]``.
+
+    Returns (wall time from spawn in ms, names of all modules imported by
+    then).
+    """
+
+    kind = scenario["kind"]
+    args = list(scenario.get("args") or [])
+    port = _free_port() if kind == "http" else None
+    if port is not None:
+        args += ["--listen", "127.0.0.1", "--port", str(port)]
+
+    # importtime output goes to a file: a server that imports many modules
+    # can fill a stderr pipe nobody reads until it exits.
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-m", module, *args],
+            cwd=str(repo_root()),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if kind == "mcp" else subprocess.DEVNULL,
+            stderr=err,
+        )
+        try:
+            if kind == "exit":
+                proc.communicate(timeout=timeout)
+                if proc.returncode != 0:
+                    raise RuntimeError(f"{module} exited with {proc.returncode}")
+            elif kind == "http":
+                assert port is not None
+                _wait_http_health(proc, port, timeout)
+            elif kind == "mcp":
+                _mcp_initialize(proc)
+            else:
+                raise ValueError(f"Unknown startup kind: {kind}")
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        err.seek(0)
+        _, loaded = _parse_importtime(err.read().decode("utf-8", "replace"))
+    return elapsed_ms, loaded
+
+
+def _forbidden(forbid: list[str], loaded: set[str]) -> list[str]:
+    return sorted(f for f in forbid if any(name == f or name.startswith(f + ".") for name in loaded))
+
+
+def check(
+    module: str,
+    *,
+    budget_ms: float | None,
+    forbid: list[str],
+    runs: int,
+    startup: dict[str, Any] | None = None,
+    scale: float = 1.0,
+) -> dict[str, Any]:
+    measure(module)  # warm-up: bytecode compilation and OS file cache
+    times: list[float] = []
+    loaded: set[str] = set()
+    for _ in range(max(1, runs)):
+        ms, loaded = measure(module)
+        times.append(ms)
+
+    forbidden = _forbidden(forbid, loaded)
+    median_ms = statistics.median(times)
+    result: dict[str, Any] = {
+        "module": module,
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(times), 1),
+        "budget_ms": None if budget_ms is None else round(budget_ms, 1),
+        "forbidden_loaded": forbidden,
+        "ok": (budget_ms is None or median_ms <= budget_ms) and not forbidden,
+    }
+
+    if startup is not None:
+        startup_times: list[float] = []
+        for _ in range(max(1, runs)):
+            ms, loaded = measure_startup(module, startup)
+            startup_times.append(ms)
+        startup_budget = startup["budget_ms"] * scale
+        startup_forbidden = _forbidden(startup.get("forbid") or [], loaded)
+        startup_median = statistics.median(startup_times)
+        result["startup"] = {
+            "kind": startup["kind"],
+            "median_ms": round(startup_median, 1),
+            "min_ms": round(min(startup_times), 1),
+            "budget_ms": round(startup_budget, 1),
+            "forbidden_loaded": startup_forbidden,
+        }
+        result["ok"] = result["ok"] and startup_median <= startup_budget and not startup_forbidden
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check entry-point import and startup time against budgets")
+    parser.add_argument("modules", nargs="*", help="entry modules to check (default: all)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=float(os.getenv("STARTUP_BUDGET_SCALE", "1.0")),
+        help="multiply all budgets (e.g. 2 on slow CI hosts)",
+    )
+    parser.add_argument("--import-only", action="store_true", help="skip the startup scenarios")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or list(ENTRY_POINTS)
+    results = []
+    for module in modules:
+        spec = ENTRY_POINTS.get(module)
+        budget = spec["budget_ms"] * args.scale if spec else None
+        results.append(
+            check(
+                module,
+                budget_ms=budget,
+                forbid=spec["forbid"] if spec else [],
+                runs=args.runs,
+                startup=None if args.import_only or not spec else spec.get("startup"),
+                scale=args.scale,
+            )
+        )
+
+    print(json.dumps(results, indent=2))
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
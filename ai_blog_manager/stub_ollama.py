@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+_WORDS = (
+    "skating olympics jump spin medal judge score coach rink ice crowd season routine "
+    "garden island villager recipe puppy breed walk leash training energy friendly "
+    "planning outline draft editor publish reader story detail moment history future"
+).split()
+
+
+@dataclass
+class StubConfig:
+    first_token_ms: float = 200.0
+    tokens_per_sec: float = 50.0
+    output_tokens: int = 300
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    embed_dim: int = 64
+    seed: int | None = None
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _fake_reply(prompt: str, cfg: StubConfig, rng: random.Random) -> dict[str, Any]:
+    tag = uuid.uuid4().hex[:8]
+    # Matched on the schema label so long-form repair prompts get the same shape.
+    if "Outline schema:" in prompt:
+        return {
+            "title": f"Stub long post {tag}",
+            "tags": ["stub", "load-test"],
+            "summary": _words(rng, 20),
+            "intro": _words(rng, 40),
+            "sections": [{"heading": f"Section {i + 1} {tag}", "points": [_words(rng, 6)]} for i in range(4)],
+        }
+    if "Section schema:" in prompt:
+        return {"content": _words(rng, cfg.output_tokens)}
+
+    paragraphs = [_words(rng, 60) for _ in range(max(1, cfg.output_tokens // 60))]
+    return {
+        "title": f"Stub post {tag}",
+        "tags": ["stub", "load-test"],
+        "summary": _words(rng, 20),
+        "content": "\n\n".join(paragraphs),
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "StubOllamaServer"  # type: ignore[assignment]
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length", "0") or "0")
+        raw = self.rfile.read(length) if length else b""
+        try:
+            obj = json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+        return obj if isinstance(obj, dict) else {}
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") == "/api/tags":
+            self._send(200, {"models": [{"name": "stub"}]})
+            return
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = self._body()
+        cfg = self.server.config
+        rng = self.server.rng()
+        stats = self.server.stats
+
+        if self.path.rstrip("/") == "/api/embeddings":
+            stats.bump("embeddings")
+            self._send(200, {"embedding": [rng.gauss(0.0, 1.0) for _ in range(cfg.embed_dim)]})
+            return
+        if self.path.rstrip("/") != "/api/chat":
+            self._send(404, {"error": "not found"})
+            return
+
+        stats.bump("chat")
+        messages = body.get("messages") or []
+        prompt = str(messages[-1].get("content") or "") if messages and isinstance(messages[-1], dict) else ""
+
+        # Simulated generation time: time-to-first-token plus decode time.
+        time.sleep(cfg.first_token_ms / 1000.0 + cfg.output_tokens / max(cfg.tokens_per_sec, 1e-6))
+
+        roll = rng.random()
+        if roll < cfg.error_rate:
+            stats.bump("errors")
+            self._send(500, {"error": "stub: simulated model failure"})
+            return
+        if roll < cfg.error_rate + cfg.malformed_rate:
+            stats.bump("malformed")
+            content = "Sure! Here is your post: {\"title\": \"Unterminated"
+        else:
+            content = json.dumps(_fake_reply(prompt, cfg, rng))
+
+        self._send(
+            200,
+            {
+                "model": body.get("model") or "stub",
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "eval_count": cfg.output_tokens,
+            },
+        )
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: dict[str, int] = {}
+
+    def bump(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    """Offline stand-in for Ollama's /api/chat and /api/embeddings.
+
+    Each chat call sleeps ``first_token_ms + output_tokens / tokens_per_sec``
+    and then fails, returns malformed JSON, or returns a payload shaped like
+    the prompt expects (post, outline or section).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], config: StubConfig) -> None:
+        super().__init__(server_address, _StubHandler)
+        self.config = config
+        self.stats = _Stats()
+        self._seed = random.Random(config.seed)
+        self._seed_lock = threading.Lock()
+
+    def rng(self) -> random.Random:
+        with self._seed_lock:
+            return random.Random(self._seed.random())
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub(config: StubConfig, *, host: str = "127.0.0.1", port: int = 0) -> StubOllamaServer:
+    server = StubOllamaServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="stub-ollama", daemon=True).start()
+    return server
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of chat calls answered with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of chat calls with invalid JSON")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        first_token_ms=args.first_token_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Stub Ollama server for offline load tests")
+    parser.add_argument("--listen", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StubOllamaServer((args.listen, args.port), config_from_args(args))
+    print(f"Stub Ollama: {server.url}")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())